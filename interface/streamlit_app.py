@@ -0,0 +1,182 @@
+"""
+Streamlit UI: price prediction, model comparison and a data summary.
+
+Streamlit re-runs this whole script on every widget interaction, so nothing
+expensive happens at the top level. The model registry, the active model
+and the dataset are ``st.cache_resource`` entries, loaded once per process
+and keyed by the active model version and the CSV content hash: a newly
+activated version or a changed CSV is picked up on the next rerun, and
+every other rerun reuses what is loaded. Predictions use the version's
+NumPy-only compiled artifact when it has one.
+
+The model comparison tab reads the leaderboard and per-fold results stored
+with each version at training time (``models.train.register_best``) rather
+than re-running cross-validation, and the data summary is aggregated with
+NumPy once per dataset. scikit-learn comes in with the registry on first use
+and is only needed by models without a compiled artifact; the charts are
+Streamlit's own, so matplotlib and seaborn are never imported.
+
+    streamlit run interface/streamlit_app.py
+"""
+import sys
+import time
+from pathlib import Path
+
+import streamlit as st
+
+SRC = Path(__file__).resolve().parents[1] / 'src' / 'regression-project'
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from config import CACHE_DIR, DATA_DIR, REGISTRY_DIR  # noqa: E402
+
+DATASET = 'housing_cleaned'
+HISTOGRAM_BINS = 40
+
+
+@st.cache_resource(show_spinner='Opening the model registry...')
+def get_registry(directory):
+    from models.persistence import ModelRegistry
+
+    return ModelRegistry(directory)
+
+
+@st.cache_resource(show_spinner='Loading the model...', max_entries=2)
+def load_model(directory, version):
+    """The model of ``version``, compiled when possible, and its metadata"""
+    registry = get_registry(directory)
+    meta = registry.metadata(version)
+    model = registry.load_compiled(version) if meta.get('compiled') else registry.load(version)
+    return model, meta
+
+
+def dataset_fingerprint(name=DATASET):
+    """Content hash of ``data/<name>.csv`` (re-hashed only when the file changed)"""
+    from utils.helpers import cached_file_sha256
+
+    return cached_file_sha256(DATA_DIR / f'{name}.csv', CACHE_DIR / 'hashes.json')
+
+
+@st.cache_resource(show_spinner='Loading the dataset...', max_entries=2)
+def load_dataset(name, fingerprint):
+    """Listings of ``data/<name>.csv``, memory-mapped from the columnar cache"""
+    from data.ingestion import load_housing
+
+    return load_housing(name)
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def data_summary(name, fingerprint):
+    """Row counts, missingness, histograms and per-bhk medians, computed once per dataset"""
+    import numpy as np
+    import pandas as pd
+
+    df = load_dataset(name, fingerprint)
+    summary = {'rows': len(df), 'missing': df.isna().sum().rename('missing').to_frame(),
+               'describe': df.describe().T, 'histograms': {}}
+    for column in ('price', 'area_sqft'):
+        values = df[column].to_numpy(dtype=float, na_value=np.nan)
+        values = values[np.isfinite(values)]
+        counts, edges = np.histogram(np.log10(values[values > 0]), bins=HISTOGRAM_BINS)
+        summary['histograms'][column] = pd.DataFrame({'listings': counts},
+                                                     index=pd.Index(np.round(10 ** edges[:-1]), name=column))
+    summary['by_bhk'] = df.groupby('bhk', observed=True).agg(
+        listings=('price', 'size'), median_price=('price', 'median'), median_area=('area_sqft', 'median'))
+    return summary
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def training_results(directory, version):
+    """The leaderboard and per-fold CV results stored with ``version`` (None if it has none)"""
+    registry = get_registry(directory)
+    if not {'leaderboard', 'cv_results'} <= set(registry.metadata(version).get('artifacts', [])):
+        return None, None
+    return (registry.load_artifact('leaderboard', version=version).copy(),
+            registry.load_artifact('cv_results', version=version).copy())
+
+
+@st.cache_data(show_spinner=False)
+def version_history(directory, versions, active):
+    """Metrics of every registered version (``versions``/``active`` key the cache)"""
+    return get_registry(directory).history()
+
+
+def predict(model, area_sqft, bhk, parking):
+    from models.compiled import CompiledModel, derive_columns
+
+    columns = {'area_sqft': [area_sqft], 'bhk': [bhk], 'parking': [parking]}
+    if isinstance(model, CompiledModel):
+        return float(model.predict(columns)[0])
+    import pandas as pd
+    from models.persistence import DERIVED_COLUMNS
+
+    return float(model.predict(pd.DataFrame(derive_columns(columns, DERIVED_COLUMNS)))[0])
+
+
+def predict_tab(model, meta):
+    left, right = st.columns(2)
+    with left:
+        area = st.number_input('Area (sq ft)', min_value=200, max_value=10000, value=1200, step=50)
+        bhk = st.slider('Bedrooms (BHK)', min_value=1, max_value=6, value=2)
+        parking = st.slider('Parking spaces', min_value=0, max_value=6, value=1)
+    started = time.perf_counter()
+    price = predict(model, area, bhk, parking)
+    with right:
+        st.metric('Predicted price', f'₹{price:,.0f}')
+        st.caption(f"{meta.get('name')} ({meta['version']}), "
+                   f"{'compiled' if meta.get('compiled') else 'scikit-learn'} model, "
+                   f'scored in {1000 * (time.perf_counter() - started):.1f} ms')
+
+
+def comparison_tab(directory, version):
+    leaderboard, results = training_results(directory, version)
+    if leaderboard is None:
+        st.info('This version was registered without training results; retrain with '
+                '`python -m models.train --register` to compare models.')
+    else:
+        # Halving candidates eliminated early were scored on fewer rows; compare finalists only
+        finalists = leaderboard[leaderboard['finalist']] if 'finalist' in leaderboard else leaderboard
+        best = finalists.sort_values('rmse').drop_duplicates('model').set_index('model')
+        st.subheader('Best candidate per model (CV RMSE)')
+        st.bar_chart(best['rmse'])
+        st.dataframe(leaderboard, hide_index=True)
+        st.subheader('Per-fold RMSE of each model\'s best candidate')
+        keys = [key for key in ('model', 'params', 'round') if key in best.reset_index() and key in results]
+        folds = results.merge(best.reset_index()[keys], on=keys)
+        st.line_chart(folds.pivot_table(index='fold', columns='model', values='rmse'))
+
+    registry = get_registry(directory)
+    st.subheader('Registered versions')
+    st.dataframe(version_history(directory, tuple(registry.versions()), version), hide_index=True)
+
+
+def data_tab(name, fingerprint):
+    summary = data_summary(name, fingerprint)
+    st.metric('Listings', f"{summary['rows']:,}")
+    left, right = st.columns(2)
+    for column, container in zip(('price', 'area_sqft'), (left, right)):
+        with container:
+            st.caption(f'{column} (log-spaced bins)')
+            st.bar_chart(summary['histograms'][column])
+    st.subheader('By bedrooms')
+    st.dataframe(summary['by_bhk'])
+    st.subheader('Columns')
+    st.dataframe(summary['describe'].join(summary['missing']))
+
+
+st.set_page_config(page_title='Delhi housing prices', layout='wide')
+st.title('Delhi housing prices')
+
+directory = str(REGISTRY_DIR)
+version = get_registry(directory).active_version()
+predict_view, comparison_view, data_view = st.tabs(['Predict', 'Model comparison', 'Data summary'])
+with predict_view:
+    if version is None:
+        st.warning(f'No active model in {directory}; train one with `python -m models.train --register`.')
+    else:
+        predict_tab(*load_model(directory, version))
+with comparison_view:
+    if version is not None:
+        comparison_tab(directory, version)
+with data_view:
+    data_tab(DATASET, dataset_fingerprint())
@@ -0,0 +1,209 @@
+"""
+Background training jobs for the API.
+
+``TrainingScheduler`` runs each ``/train`` request as a ``ModelZooTrainer``
+search in a separate process, so the server's event loop and prediction
+threads never wait on training. At most ``MAX_TRAINING_JOBS`` run at once;
+the rest are queued. Training processes are niced (``TRAINING_NICENESS``),
+and their own worker pools inherit that, so on shared cores the scheduler
+gives the prediction server the CPU first.
+
+Progress events (one per finished model/fold job) come back over a manager
+queue and are folded into each job's status. A cancelled job stops
+dispatching trainer jobs and ends without touching the registry. A finished
+job refits the best candidate on all rows and registers it as a new version,
+which becomes active through the registry's atomic ``ACTIVE`` swap; running
+servers pick it up on their next pointer check.
+"""
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+from config import CV_FOLDS, MAX_TRAINING_JOBS, TRAINING_NICENESS, TRAINING_WORKERS
+from models.persistence import ModelRegistry
+from models.train import MODEL_ZOO, ModelZooTrainer, prepare_training_data, register_best
+
+FINISHED = ('done', 'cancelled', 'failed')
+
+
+def _init_training_process():
+    # Once per pool process: os.nice is relative, so calling it per job would stack in reused processes
+    os.nice(TRAINING_NICENESS)
+
+
+def run_training_job(job_id, spec, registry_dir, events, cancel):
+    """Training process body: cross-validate, refit the best candidate and register it"""
+    if cancel.is_set():
+        return None
+    events.put((job_id, 'status', {'status': 'running', 'stage': 'loading data'}))
+    features, y = prepare_training_data(spec['data'])
+    trainer = ModelZooTrainer(spec['models'], n_splits=spec['folds'], n_jobs=spec['workers'], search=spec['search'])
+    events.put((job_id, 'status', {'stage': 'cross-validating'}))
+
+    def progress(done, total, row):
+        events.put((job_id, 'progress', {'done': done, 'total': total, 'model': row['model'],
+                                         'params': row['params'], 'fold': row['fold'], 'rmse': row['rmse']}))
+
+    trainer.run(features, y, progress=progress, cancel=cancel)
+    if cancel.is_set() or trainer.leaderboard_.empty:
+        return None
+
+    events.put((job_id, 'status', {'stage': 'refitting best model and registering'}))
+    return register_best(trainer, features, y, ModelRegistry(registry_dir), activate=spec['promote'],
+                         cancel=cancel, training_job=job_id, search=spec['search'], folds=spec['folds'])
+
+
+class TrainingScheduler:
+    """
+    Queue of training jobs run in a capped process pool.
+
+    >>> scheduler = TrainingScheduler(registry)
+    >>> job = scheduler.submit(models=['ridge', 'knn'])
+    >>> scheduler.status(job['id'])['progress']
+    >>> scheduler.cancel(job['id'])
+    """
+
+    def __init__(self, registry, max_jobs=MAX_TRAINING_JOBS, workers=TRAINING_WORKERS):
+        self.registry = registry
+        self.max_jobs = max_jobs
+        self.workers = workers
+        context = multiprocessing.get_context('spawn')  # The server has threads; never fork it
+        self._pool = ProcessPoolExecutor(max_jobs, mp_context=context, initializer=_init_training_process)
+        self._manager = context.Manager()
+        self._events = self._manager.Queue()
+        self._jobs = {}
+        self._queued = deque()  # Held here, not in the pool, so queued jobs can be dropped
+        self._running = 0
+        self._lock = threading.RLock()  # cancel() can run _finished synchronously
+        self._listener = threading.Thread(target=self._listen, name='training-events', daemon=True)
+        self._listener.start()
+
+    def submit(self, models=None, folds=CV_FOLDS, search='fast', data='housing_cleaned', promote=True):
+        """Queue a training job and return its status"""
+        models = list(models or MODEL_ZOO)
+        unknown = sorted(set(models) - set(MODEL_ZOO))
+        if unknown:
+            raise ValueError(f'Unknown models {unknown}; choose from {sorted(MODEL_ZOO)}')
+        if search not in ('grid', 'fast'):
+            raise ValueError(f"search must be 'grid' or 'fast', got {search!r}")
+        job_id = uuid.uuid4().hex[:12]
+        spec = {'models': models, 'folds': folds, 'search': search, 'data': data, 'promote': promote,
+                'workers': self.workers}
+        job = {'id': job_id, 'status': 'queued', 'stage': None, 'spec': spec, 'submitted': time.time(),
+               'started': None, 'finished': None, 'version': None, 'error': None,
+               'progress': {'done': 0, 'total': None, 'models': {}}}
+        with self._lock:
+            self._jobs[job_id] = (job, self._manager.Event(), None)
+            self._queued.append(job_id)
+            self._dispatch()
+        return self.status(job_id)
+
+    def _dispatch(self):
+        """Start queued jobs while fewer than ``max_jobs`` are running (call with the lock held)"""
+        while self._queued and self._running < self.max_jobs:
+            job_id = self._queued.popleft()
+            job, cancel, _ = self._jobs[job_id]
+            self._running += 1
+            future = self._pool.submit(run_training_job, job_id, job['spec'], str(self.registry.directory),
+                                       self._events, cancel)
+            self._jobs[job_id] = (job, cancel, future)
+            job['status'] = 'starting'
+            future.add_done_callback(lambda f, job_id=job_id: self._finished(job_id, f))
+
+    def _listen(self):
+        while True:
+            try:
+                job_id, kind, payload = self._events.get()
+            except (EOFError, OSError):
+                return  # Manager shut down
+            with self._lock:
+                if job_id not in self._jobs:
+                    continue
+                job = self._jobs[job_id][0]
+                if kind == 'status' and job['status'] in FINISHED:
+                    continue
+                if kind == 'status':
+                    if payload.get('status') == 'running':
+                        job['started'] = time.time()
+                    if job['status'] != 'cancelling':
+                        job.update(payload)
+                    else:
+                        job['stage'] = payload.get('stage', job['stage'])
+                else:
+                    self._record_progress(job['progress'], payload)
+
+    @staticmethod
+    def _record_progress(progress, event):
+        progress['done'], progress['total'] = event['done'], event['total']
+        model = progress['models'].setdefault(event['model'], {'jobs_done': 0, 'folds': {}, 'best_rmse': None})
+        model['jobs_done'] += 1
+        fold = str(event['fold'])
+        model['folds'][fold] = model['folds'].get(fold, 0) + 1
+        if model['best_rmse'] is None or event['rmse'] < model['best_rmse']:
+            model['best_rmse'] = event['rmse']
+            model['best_params'] = event['params']
+
+    def _finished(self, job_id, future):
+        with self._lock:
+            job = self._jobs[job_id][0]
+            job['finished'] = time.time()
+            self._running -= 1
+            try:
+                version = future.result()
+            except CancelledError:
+                version = None
+            except Exception as error:
+                version = None
+                job['error'] = f'{type(error).__name__}: {error}'
+            if job['error'] is not None:
+                job['status'] = 'failed'
+            elif version is None:
+                job['status'] = 'cancelled'
+            else:
+                job['status'], job['stage'], job['version'] = 'done', None, version
+            self._dispatch()
+
+    def cancel(self, job_id):
+        """Drop a queued job, or stop a running one after its in-flight trainer jobs"""
+        with self._lock:
+            job, cancel, _ = self._jobs[job_id]
+            if job['status'] in FINISHED:
+                return dict(job)
+            cancel.set()
+            if job_id in self._queued:
+                self._queued.remove(job_id)
+                job['status'], job['finished'] = 'cancelled', time.time()
+            else:
+                job['status'] = 'cancelling'
+        return self.status(job_id)
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs[job_id][0]
+            return json.loads(json.dumps(job))  # Deep copy, safe to serialize outside the lock
+
+    def jobs(self):
+        with self._lock:
+            ids = list(self._jobs)
+        return [self.status(job_id) for job_id in ids]
+
+    def __contains__(self, job_id):
+        return job_id in self._jobs
+
+    def summary(self):
+        counts = {}
+        for job in self.jobs():
+            counts[job['status']] = counts.get(job['status'], 0) + 1
+        return counts
+
+    def shutdown(self):
+        """Cancel everything and stop the pool (running trainers finish their in-flight fits)"""
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._manager.shutdown()
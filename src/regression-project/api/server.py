@@ -0,0 +1,483 @@
+"""
+Prediction API.
+
+Single-listing ``/predict`` requests are not scored one by one: they join a
+queue that ``MicroBatcher`` flushes as one vectorized ``predict`` call, as
+soon as ``MAX_BATCH_SIZE`` requests are waiting or ``MAX_BATCH_WAIT_MS``
+after the first one arrived. Scoring runs in a worker thread, so the event
+loop keeps accepting requests while a batch is being scored (and the next
+batch fills up meanwhile). ``/predict/batch`` scores a list of listings in
+one call. The model is the registry's active version (see
+``models.persistence.ActiveModel``), picked up without a restart when it
+changes.
+
+``/train`` queues a model-zoo search in a separate process (see
+``api.jobs.TrainingScheduler``); its status shows progress per model and
+fold, and a finished job's best model is promoted through the registry.
+
+``/score-jobs`` runs a resumable ``models.bulk_scoring`` job over a CSV
+under ``data/`` in a background thread; submitting the same file again
+resumes an interrupted job.
+
+In front of the model sits ``PredictionCache``: listings are normalized
+(area rounded to ``AREA_ROUNDING_SQFT``, location standardized) and the
+normalized tuple is the key of a bounded LRU cache of prices. The feature
+space is small, so most repeat valuations never reach the model. The cache
+is emptied whenever the active model version changes.
+
+Run and load-test from ``src/regression-project``::
+
+    python -m api.server serve
+    python -m api.server loadtest --requests 5000 --concurrency 64
+"""
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+from config import (API_HOST, API_PORT, AREA_ROUNDING_SQFT, CV_FOLDS, DATA_DIR, MAX_BATCH_SIZE, MAX_BATCH_WAIT_MS,
+                    PREDICTION_CACHE_SIZE, SCORES_DIR)
+from api.jobs import TrainingScheduler
+from features.feature_engineering import standardize_location
+from models.bulk_scoring import CHUNKSIZE, BulkScoringJob
+from models.compiled import CompiledModel, derive_columns
+from models.persistence import DERIVED_COLUMNS, REGISTRY_DIR, ActiveModel, ModelRegistry
+
+LATENCY_WINDOW = 10000  # Requests kept for the latency percentiles
+
+
+class Listing(BaseModel):
+    area_sqft: float = Field(gt=0)
+    bhk: int = Field(ge=1, le=20)
+    parking: int = Field(0, ge=0)
+    location: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    listings: List[Listing]
+
+
+class TrainRequest(BaseModel):
+    models: Optional[List[str]] = None  # Default: the whole model zoo
+    folds: int = Field(CV_FOLDS, ge=2)
+    search: str = 'fast'
+    data: str = 'housing_cleaned'  # CSV name under data/, without .csv
+    promote: bool = True  # Make the new version active when the job finishes
+
+
+class ScoreJobRequest(BaseModel):
+    input: str  # CSV path relative to data/
+    name: Optional[str] = None  # Output directory under data/scores (default: the input's name)
+    chunksize: int = Field(CHUNKSIZE, gt=0)
+
+
+def normalize_listing(listing, area_rounding=AREA_ROUNDING_SQFT):
+    """``listing`` as it is scored and cached: area rounded, location standardized"""
+    area = max(area_rounding, round(listing.area_sqft / area_rounding) * area_rounding) if area_rounding else \
+        listing.area_sqft
+    return Listing(area_sqft=area, bhk=listing.bhk, parking=listing.parking,
+                   location=standardize_location(listing.location))
+
+
+def cache_key(listing):
+    """Key of a normalized listing"""
+    return listing.area_sqft, listing.bhk, listing.parking, listing.location
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of prices by normalized listing, tied to one model version.
+
+    ``invalidate(version)`` empties the cache and starts accepting prices of
+    ``version`` only, so a batch that was scored by the previous model and
+    finishes after a swap cannot repopulate it with stale prices.
+
+    >>> cache = PredictionCache(maxsize=100000)
+    >>> cache.get(key)            # None on a miss
+    >>> cache.put(key, price, version)
+    """
+
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            price = self._entries.get(key)
+            if price is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return price
+
+    def put(self, key, price, version):
+        with self._lock:
+            if version != self.version or self.maxsize <= 0:
+                return
+            self._entries[key] = price
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, version=None):
+        with self._lock:
+            self._entries.clear()
+            self.version = version
+            self.invalidations += 1
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None, 'evictions': self.evictions,
+                'invalidations': self.invalidations, 'model_version': self.version}
+
+
+def listing_columns(listings):
+    """Request listings as model input columns (raw fields plus the derived ones)"""
+    columns = {field: [getattr(listing, field) for listing in listings] for field in Listing.model_fields}
+    return derive_columns(columns, DERIVED_COLUMNS)
+
+
+def score(model, listings):
+    """Prices for ``listings`` from a compiled model or a scikit-learn pipeline"""
+    columns = listing_columns(listings)
+    if isinstance(model, CompiledModel):
+        return model.predict(columns)
+    return model.predict(pd.DataFrame(columns))
+
+
+class LatencyStats:
+    """Latencies of the most recent requests, for percentiles and throughput"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.finished = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds, n=1):
+        now = time.perf_counter()
+        for _ in range(n):
+            self.latencies.append(seconds)
+            self.finished.append(now)
+        self.count += n
+
+    def summary(self):
+        if not self.latencies:
+            return {'requests': self.count}
+        latencies = np.fromiter(self.latencies, dtype=float)
+        span = self.finished[-1] - self.finished[0]
+        return {
+            'requests': self.count,
+            'p50_ms': 1000 * float(np.percentile(latencies, 50)),
+            'p99_ms': 1000 * float(np.percentile(latencies, 99)),
+            'throughput_per_second': (len(self.finished) - 1) / span if span > 0 else None,
+        }
+
+
+class MicroBatcher:
+    """
+    Collects single predictions into batches for ``predict_batch(listings)``.
+
+    >>> batcher = MicroBatcher(lambda listings: score(model, listings))
+    >>> await batcher.start()
+    >>> price = await batcher.submit(listing)
+    """
+
+    def __init__(self, predict_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS, executor=None):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor or ThreadPoolExecutor(1, thread_name_prefix='predict')
+        self.stats = LatencyStats()
+        self.batch_sizes = deque(maxlen=1000)
+        self._queue = None
+        self._task = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, listing):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((listing, future, time.perf_counter()))
+        return await future
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            listings = [listing for listing, _, _ in batch]
+            try:
+                prices = await loop.run_in_executor(self.executor, self.predict_batch, listings)
+            except Exception as error:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            now = time.perf_counter()
+            for (_, future, queued), price in zip(batch, prices):
+                if not future.done():
+                    future.set_result(float(price))
+                self.stats.record(now - queued)
+            self.batch_sizes.append(len(batch))
+
+    def summary(self):
+        sizes = np.fromiter(self.batch_sizes, dtype=float)
+        return {**self.stats.summary(), 'mean_batch_size': float(sizes.mean()) if len(sizes) else None}
+
+
+def create_app(registry=None, compiled=True, cache_size=PREDICTION_CACHE_SIZE, area_rounding=AREA_ROUNDING_SQFT):
+    """The FastAPI app serving the active model of ``registry`` behind a prediction cache"""
+    registry = registry or ModelRegistry(REGISTRY_DIR)
+    active = ActiveModel(registry, compiled=compiled)
+    cache = PredictionCache(cache_size)
+    active.on_swap(lambda old, new: cache.invalidate(new))
+    batcher = MicroBatcher(lambda listings: score(active.get(), listings))
+    batch_stats = LatencyStats()
+
+    async def current_version():
+        """Active version, checking the registry pointer (and so invalidating the cache) if it is due"""
+        try:
+            if active.check_due():  # The check may load a model; keep that off the event loop
+                await asyncio.get_running_loop().run_in_executor(None, active.get)
+        except LookupError as error:
+            raise HTTPException(503, str(error))
+        return active.version
+
+    training = None
+
+    @asynccontextmanager
+    async def lifespan(app):
+        nonlocal training
+        await batcher.start()
+        training = app.state.training = TrainingScheduler(registry)
+        yield
+        training.shutdown()
+        scoring.shutdown(wait=False, cancel_futures=True)
+        await batcher.stop()
+
+    app = FastAPI(title='Housing price prediction', lifespan=lifespan)
+    app.state.model, app.state.batcher, app.state.cache = active, batcher, cache
+
+    @app.post('/predict')
+    async def predict(listing: Listing):
+        start = time.perf_counter()
+        version = await current_version()
+        listing = normalize_listing(listing, area_rounding)
+        key = cache_key(listing)
+        price = cache.get(key)
+        if price is not None:
+            batcher.stats.record(time.perf_counter() - start)
+            return {'price': price, 'model_version': version, 'cached': True}
+        price = await batcher.submit(listing)
+        cache.put(key, price, version)
+        return {'price': price, 'model_version': version, 'cached': False}
+
+    @app.post('/predict/batch')
+    async def predict_batch(request: BatchRequest):
+        start = time.perf_counter()
+        version = await current_version()
+        listings = [normalize_listing(listing, area_rounding) for listing in request.listings]
+        keys = [cache_key(listing) for listing in listings]
+        prices = [cache.get(key) for key in keys]
+        missing = [i for i, price in enumerate(prices) if price is None]
+        if missing:
+            # Only the cache misses are scored, in one call
+            scored = await asyncio.get_running_loop().run_in_executor(
+                batcher.executor, lambda: score(active.get(), [listings[i] for i in missing]))
+            for i, price in zip(missing, scored):
+                prices[i] = float(price)
+                cache.put(keys[i], prices[i], version)
+        batch_stats.record(time.perf_counter() - start)
+        return {'prices': prices, 'model_version': version, 'cached': len(listings) - len(missing)}
+
+    @app.post('/train', status_code=202)
+    async def train(request: TrainRequest):
+        data_dir = DATA_DIR.resolve()
+        data_path = (data_dir / f'{request.data}.csv').resolve()
+        if data_dir not in data_path.parents or not data_path.is_file():
+            raise HTTPException(404, f'No CSV {request.data!r} under {DATA_DIR}')
+        try:
+            return training.submit(request.models, request.folds, request.search, request.data, request.promote)
+        except ValueError as error:
+            raise HTTPException(422, str(error))
+
+    @app.get('/train')
+    async def list_training():
+        return training.jobs()
+
+    @app.get('/train/{job_id}')
+    async def training_status(job_id: str):
+        if job_id not in training:
+            raise HTTPException(404, f'Unknown training job {job_id!r}')
+        return training.status(job_id)
+
+    @app.delete('/train/{job_id}')
+    async def cancel_training(job_id: str):
+        if job_id not in training:
+            raise HTTPException(404, f'Unknown training job {job_id!r}')
+        return training.cancel(job_id)
+
+    score_jobs = {}
+    scoring = ThreadPoolExecutor(1, thread_name_prefix='bulk-score')
+
+    def public(job):
+        return {key: value for key, value in job.items() if key != 'cancel'}
+
+    @app.post('/score-jobs', status_code=202)
+    async def start_scoring(request: ScoreJobRequest):
+        data_dir = DATA_DIR.resolve()
+        input_path = (data_dir / request.input).resolve()
+        if data_dir not in input_path.parents or not input_path.is_file():
+            raise HTTPException(404, f'No CSV {request.input!r} under {DATA_DIR}')
+        name = request.name or input_path.stem
+        output = SCORES_DIR / name
+        if output.resolve().parent != SCORES_DIR.resolve():  # One directory directly under SCORES_DIR
+            raise HTTPException(400, f'Invalid output name {name!r}; use a plain directory name')
+        if any(job['name'] == name and job['status'] in ('queued', 'running') for job in score_jobs.values()):
+            raise HTTPException(409, f'A scoring job is already writing {name!r}')
+        job_id = uuid.uuid4().hex[:12]
+        job = score_jobs[job_id] = {'id': job_id, 'name': name, 'input': request.input,
+                                    'output': str(output), 'status': 'queued', 'progress': {},
+                                    'error': None, 'cancel': threading.Event()}
+
+        def work():
+            job['status'] = 'running'
+            try:
+                bulk = BulkScoringJob(input_path, output, active.registry,
+                                      chunksize=request.chunksize, compiled=active.compiled)
+                job['progress'] = bulk.run(progress=job['progress'].update, cancel=job['cancel'].is_set)
+                job['status'] = 'done' if job['progress']['complete'] else 'cancelled'
+            except Exception as error:
+                job['status'], job['error'] = 'failed', f'{type(error).__name__}: {error}'
+
+        asyncio.get_running_loop().run_in_executor(scoring, work)
+        return public(job)
+
+    @app.get('/score-jobs')
+    async def list_scoring():
+        return [public(job) for job in score_jobs.values()]
+
+    @app.get('/score-jobs/{job_id}')
+    async def scoring_status(job_id: str):
+        if job_id not in score_jobs:
+            raise HTTPException(404, f'Unknown scoring job {job_id!r}')
+        return public(score_jobs[job_id])
+
+    @app.delete('/score-jobs/{job_id}')
+    async def cancel_scoring(job_id: str):
+        """Stop after the current chunk; resubmitting the same input resumes the job"""
+        if job_id not in score_jobs:
+            raise HTTPException(404, f'Unknown scoring job {job_id!r}')
+        score_jobs[job_id]['cancel'].set()
+        return public(score_jobs[job_id])
+
+    @app.get('/status')
+    async def status():
+        return {
+            'model_version': active.version,
+            'model_load_seconds': active.load_seconds,
+            'predict': batcher.summary(),
+            'predict_batch': batch_stats.summary(),
+            'cache': cache.summary(),
+            'training_jobs': training.summary() if training is not None else {},
+        }
+
+    return app
+
+
+async def load_test(base_url, n_requests=5000, concurrency=64, seed=0):
+    """
+    Fire ``n_requests`` single-listing ``/predict`` calls, ``concurrency`` at a
+    time, and return the client-side latency percentiles and throughput.
+    """
+    import httpx
+
+    rng = np.random.default_rng(seed)
+    bodies = [{'area_sqft': float(a), 'bhk': int(b), 'parking': int(p)} for a, b, p in
+              zip(rng.uniform(400, 4000, n_requests).round(), rng.integers(1, 6, n_requests),
+                  rng.integers(0, 3, n_requests))]
+    latencies = np.empty(n_requests)
+    pending = iter(enumerate(bodies))
+
+    async def worker(client):
+        for i, body in pending:
+            start = time.perf_counter()
+            response = await client.post('/predict', json=body)
+            response.raise_for_status()
+            latencies[i] = time.perf_counter() - start
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        seconds = time.perf_counter() - start
+        server = (await client.get('/status')).json()
+    return {
+        'requests': n_requests,
+        'concurrency': concurrency,
+        'p50_ms': 1000 * float(np.percentile(latencies, 50)),
+        'p99_ms': 1000 * float(np.percentile(latencies, 99)),
+        'throughput_per_second': n_requests / seconds,
+        'server': server,
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Serve or load-test the prediction API')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve')
+    serve.add_argument('--host', default=API_HOST)
+    serve.add_argument('--port', type=int, default=API_PORT)
+    serve.add_argument('--sklearn', action='store_true', help='Serve the pipeline even if a compiled model exists')
+    loadtest = commands.add_parser('loadtest')
+    loadtest.add_argument('--url', default=f'http://{API_HOST}:{API_PORT}')
+    loadtest.add_argument('--requests', type=int, default=5000)
+    loadtest.add_argument('--concurrency', type=int, default=64)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        import uvicorn
+
+        uvicorn.run(create_app(compiled=not args.sklearn), host=args.host, port=args.port)
+    else:
+        print(json.dumps(asyncio.run(load_test(args.url, args.requests, args.concurrency)), indent=2))
@@ -0,0 +1,40 @@
+import os
+from pathlib import Path
+
+# Paths
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+DATA_DIR = PROJECT_ROOT / 'data'
+SNAPSHOT_DIR = DATA_DIR / 'snapshots'  # Raw page HTML saved by the scraper
+CACHE_DIR = DATA_DIR / '.cache'  # Columnar caches keyed by CSV content hash
+CHECKPOINT_DIR = DATA_DIR / 'scrape_checkpoint'  # Append-only rows + completed pages of the current scrape
+SCORES_DIR = DATA_DIR / 'scores'  # Bulk-scoring outputs, one directory per job
+MODELS_DIR = PROJECT_ROOT / 'models'
+REGISTRY_DIR = Path(os.environ.get('REGRESSION_REGISTRY_DIR', MODELS_DIR / 'registry'))  # Model versions + ACTIVE pointer
+REPORTS_DIR = PROJECT_ROOT / 'reports'
+
+# Scraper
+BASE_URL = "https://housing.com/in/buy/new_delhi/new_delhi?page={}"
+MAX_PROPERTIES = 12000  # Target number of properties
+MAX_PAGES = 500  # Maximum number of pages to scrape
+MAX_RETRIES = 3  # Maximum number of retries for failed pages
+SCRAPE_WORKERS = 4  # Browsers fetching pages concurrently
+REQUESTS_PER_SECOND = 1.0  # Shared rate limit across all scrape workers
+
+# Parallelism
+N_JOBS = int(os.environ.get('REGRESSION_N_JOBS', os.cpu_count() or 1))
+
+# Training
+CV_FOLDS = 5
+
+# Serving
+API_HOST = os.environ.get('REGRESSION_API_HOST', '127.0.0.1')
+API_PORT = int(os.environ.get('REGRESSION_API_PORT', 8000))
+MAX_BATCH_SIZE = 256  # Single-listing requests scored together
+MAX_BATCH_WAIT_MS = 2.0  # How long the first queued request waits for others
+PREDICTION_CACHE_SIZE = 100000  # Normalized listings whose prices are kept (LRU)
+AREA_ROUNDING_SQFT = 10  # Areas are rounded to this before scoring and caching
+MAX_TRAINING_JOBS = 1  # Background training jobs run at once; more wait in the queue
+TRAINING_WORKERS = max(1, N_JOBS - 1)  # Processes per training job; one core is left for serving
+TRAINING_NICENESS = 10  # Training processes yield the CPU to the prediction server
+
+RANDOM_STATE = 42
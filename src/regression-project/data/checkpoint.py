@@ -0,0 +1,106 @@
+"""
+Append-only, resumable checkpoint store for scrape runs.
+
+Parsed rows are appended to ``rows.jsonl`` one page at a time, then a commit
+line for the page (its listing ids and the byte offset of the rows file) is
+appended to ``pages.jsonl``. A page only counts as done once its commit line
+is written, so on reopen any rows past the last committed offset (a crash
+mid-page) are truncated and that page is fetched again. Nothing is ever
+rewritten, so checkpointing cost grows with the batch, not the total.
+"""
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+
+class CheckpointStore:
+    """Resumable store of scraped rows, completed pages and seen listing ids"""
+
+    ROWS_FILE = 'rows.jsonl'
+    PAGES_FILE = 'pages.jsonl'
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.rows_path = self.directory / self.ROWS_FILE
+        self.pages_path = self.directory / self.PAGES_FILE
+        self.completed_pages = set()
+        self.seen = set()
+        self.row_count = 0
+        self._recover()
+
+    def _recover(self):
+        offset = 0
+        if self.pages_path.exists():
+            with open(self.pages_path, 'rb') as f:
+                good_bytes = 0
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Torn final line from a crash
+                    good_bytes += len(line)
+                    self.completed_pages.add(entry['page'])
+                    self.seen.update(entry['ids'])
+                    self.row_count += entry['rows']
+                    offset = entry['offset']
+            _truncate(self.pages_path, good_bytes)
+        if self.rows_path.exists():
+            _truncate(self.rows_path, offset)
+
+    def append_page(self, page, records):
+        """
+        Append one page's parsed records and mark the page complete.
+
+        Records whose listing id was already stored are dropped; returns the
+        number of rows actually written. An empty ``records`` marks a page
+        without listings complete.
+        """
+        new_records = []
+        new_ids = []
+        for record in records:
+            listing_id = record['listing_id']
+            if listing_id in self.seen:
+                continue
+            self.seen.add(listing_id)
+            new_ids.append(listing_id)
+            new_records.append(record)
+
+        with open(self.rows_path, 'a', encoding='utf-8') as f:
+            for record in new_records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+            offset = f.tell()
+
+        entry = {'page': page, 'ids': new_ids, 'rows': len(new_records), 'offset': offset}
+        with open(self.pages_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.completed_pages.add(page)
+        self.row_count += len(new_records)
+        return len(new_records)
+
+    def pending_pages(self, max_pages, start=1):
+        """Pages in ``start..max_pages`` that have not been completed yet, in order"""
+        return [page for page in range(start, max_pages + 1) if page not in self.completed_pages]
+
+    @property
+    def last_completed_page(self):
+        return max(self.completed_pages) if self.completed_pages else 0
+
+    def load_frame(self, chunksize=None):
+        """Load stored rows as a DataFrame (or an iterator of frames with ``chunksize``)"""
+        if not self.rows_path.exists() or self.rows_path.stat().st_size == 0:
+            return pd.DataFrame()
+        return pd.read_json(self.rows_path, lines=True, dtype={'listing_id': str}, chunksize=chunksize)
+
+
+def _truncate(path, size):
+    if path.exists() and path.stat().st_size > size:
+        with open(path, 'r+b') as f:
+            f.truncate(size)
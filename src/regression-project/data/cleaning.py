@@ -0,0 +1,213 @@
+"""
+Declarative cleaning rules for the housing dataset.
+
+Each rule maps a frame to a boolean "keep" mask. ``apply_rules`` evaluates a
+whole rule set into one (rows x rules) boolean matrix, keeps the rows that
+pass every rule with a single ``take``, and reports how many rows each rule
+dropped and how the rules overlap. The two notebook pipelines,
+``clean_housing_data`` and ``advanced_data_cleaning``, are the ``BASIC_RULES``
+and ``ADVANCED_RULES`` sets.
+"""
+from dataclasses import dataclass
+from typing import Callable, List
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A named row filter; ``func(df)`` returns a boolean array, True for rows to keep"""
+    name: str
+    func: Callable
+    description: str = ''
+
+
+def _values(df, column):
+    """Column as a float array (NaN for missing or absent columns)"""
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return df[column].to_numpy(dtype=float, na_value=np.nan)
+
+
+def _price_per_sqft(df):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _values(df, 'price') / _values(df, 'area_sqft')
+
+
+def between(column, low, high, description=''):
+    """Keep rows with ``low <= column <= high`` (missing values are dropped)"""
+    def func(df):
+        values = _values(df, column)
+        return (values >= low) & (values <= high)
+    return Rule(f'{column}_range', func, description or f'{low:g} <= {column} <= {high:g}')
+
+
+def not_missing(column):
+    """Keep rows where ``column`` is present"""
+    return Rule(f'{column}_present', lambda df: ~np.isnan(_values(df, column)), f'{column} is not missing')
+
+
+def any_present(*columns):
+    """Keep rows where at least one of ``columns`` is present"""
+    def func(df):
+        present = np.zeros(len(df), dtype=bool)
+        for column in columns:
+            if column in df.columns:
+                present |= df[column].notna().to_numpy()
+        return present
+    return Rule(f"any_{'_or_'.join(columns)}", func, f"one of {', '.join(columns)} is present")
+
+
+def price_per_sqft_between(low, high, allow_missing_area=False):
+    """Keep rows whose price per sqft is within ``[low, high]``"""
+    def func(df):
+        psqft = _price_per_sqft(df)
+        keep = (psqft >= low) & (psqft <= high)
+        if allow_missing_area:
+            keep |= np.isnan(_values(df, 'area_sqft'))
+        return keep
+    return Rule('price_per_sqft_range', func, f'{low:g} <= price/sqft <= {high:g}')
+
+
+def min_area_per_bhk(sqft):
+    """Keep rows with at least ``sqft`` square feet per bedroom"""
+    def func(df):
+        return _values(df, 'area_sqft') >= _values(df, 'bhk') * sqft
+    return Rule('area_per_bhk', func, f'area_sqft >= {sqft:g} * bhk')
+
+
+# clean_housing_data: 1 Lakh to 100 Cr, 1-10 BHK, ₹500-150000 per sqft
+BASIC_RULES = [
+    any_present('area_sqft', 'area_text'),
+    not_missing('price'),
+    between('price', 100000, 1000000000),
+    between('bhk', 1, 10),
+    price_per_sqft_between(500, 150000, allow_missing_area=True),
+]
+
+# advanced_data_cleaning: Delhi/NCR domain ranges
+ADVANCED_RULES = [
+    between('price', 1000000, 500000000, 'Reasonable price range for Delhi/NCR: 10 Lakh to 50 Crore'),
+    between('area_sqft', 200, 10000, 'Reasonable area range: 200 to 10000 sq ft'),
+    min_area_per_bhk(150),
+    price_per_sqft_between(2000, 40000),
+    between('bhk', 1, 6),
+]
+
+# Listings to be valued: the advanced input ranges, without the rules that need a price
+SCORING_RULES = [
+    between('area_sqft', 200, 10000, 'Reasonable area range: 200 to 10000 sq ft'),
+    min_area_per_bhk(150),
+    between('bhk', 1, 6),
+]
+
+RULE_SETS = {'basic': BASIC_RULES, 'advanced': ADVANCED_RULES, 'scoring': SCORING_RULES}
+
+
+@dataclass
+class CleaningReport:
+    """Per-rule drop counts of one cleaning run"""
+    rule_names: List[str]
+    initial_rows: int
+    final_rows: int
+    failed: np.ndarray  # rows failing each rule (regardless of other rules)
+    exclusive: np.ndarray  # rows failing only this rule
+    first_failed: np.ndarray  # rows attributed to the first failing rule, as in a sequential pipeline
+    overlap: np.ndarray  # (rules x rules) rows failing both rules
+
+    @property
+    def removed(self):
+        return self.initial_rows - self.final_rows
+
+    @property
+    def retention_rate(self):
+        return self.final_rows / self.initial_rows * 100 if self.initial_rows else 100.0
+
+    def summary(self):
+        return pd.DataFrame({
+            'failed': self.failed,
+            'only_this_rule': self.exclusive,
+            'sequential_drop': self.first_failed,
+        }, index=pd.Index(self.rule_names, name='rule'))
+
+    def overlap_frame(self):
+        return pd.DataFrame(self.overlap, index=self.rule_names, columns=self.rule_names)
+
+    def __add__(self, other):
+        """Combine the reports of two chunks cleaned with the same rules"""
+        return CleaningReport(
+            rule_names=self.rule_names,
+            initial_rows=self.initial_rows + other.initial_rows,
+            final_rows=self.final_rows + other.final_rows,
+            failed=self.failed + other.failed,
+            exclusive=self.exclusive + other.exclusive,
+            first_failed=self.first_failed + other.first_failed,
+            overlap=self.overlap + other.overlap,
+        )
+
+    def __str__(self):
+        return (f"Initial records: {self.initial_rows:,}\n"
+                f"Final records: {self.final_rows:,}\n"
+                f"Removed: {self.removed:,} ({100 - self.retention_rate:.1f}%)\n"
+                f"{self.summary().to_string()}")
+
+
+def evaluate_rules(df, rules):
+    """Evaluate every rule into one (rows x rules) boolean keep matrix"""
+    keep = np.empty((len(df), len(rules)), dtype=bool)
+    for j, rule in enumerate(rules):
+        keep[:, j] = rule.func(df)
+    return keep
+
+
+def report_from_matrix(keep, rules):
+    """Build a ``CleaningReport`` from a keep matrix"""
+    fail = ~keep
+    n_failed = fail.sum(axis=1)
+    dropped = n_failed > 0
+    # With no rules nothing is dropped (and argmax of an empty row would raise)
+    first = np.argmax(fail[dropped], axis=1) if len(rules) else np.zeros(0, dtype=np.intp)
+    fail_int = fail.astype(np.int32)
+    return CleaningReport(
+        rule_names=[rule.name for rule in rules],
+        initial_rows=len(keep),
+        final_rows=int((~dropped).sum()),
+        failed=fail.sum(axis=0),
+        exclusive=fail[n_failed == 1].sum(axis=0),
+        first_failed=np.bincount(first, minlength=len(rules)),
+        overlap=fail_int.T @ fail_int,
+    )
+
+
+def apply_rules(df, rules='advanced', add_price_per_sqft=True):
+    """
+    Drop every row that fails any rule, copying the frame once.
+
+    ``rules`` is a list of ``Rule`` or the name of a set in ``RULE_SETS``.
+    Returns the cleaned frame and a ``CleaningReport``.
+    """
+    if isinstance(rules, str):
+        rules = RULE_SETS[rules]
+    keep = evaluate_rules(df, rules)
+    report = report_from_matrix(keep, rules)
+    clean = df.take(np.flatnonzero(keep.all(axis=1)))
+    if add_price_per_sqft and 'price' in clean.columns and 'area_sqft' in clean.columns:
+        clean['price_per_sqft'] = _price_per_sqft(clean)
+    return clean, report
+
+
+def standardize_locations(df, column='location', out_column='location_clean'):
+    """
+    Strip, title-case and normalise 'Sector N' spellings of the location column.
+
+    The string work runs once per distinct location and the result is a categorical.
+    """
+    if column not in df.columns:
+        return df
+    codes, uniques = pd.factorize(df[column], use_na_sentinel=True)
+    cleaned = (pd.Series(uniques, dtype='string').str.strip().str.title()
+               .str.replace(r'Sector\s+(\d+)', r'Sector \1', regex=True))
+    cleaned = np.append(cleaned.to_numpy(dtype=object, na_value=None), None)  # code -1 -> missing
+    df[out_column] = pd.Categorical(cleaned[codes])
+    return df
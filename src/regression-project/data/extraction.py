@@ -0,0 +1,178 @@
+"""
+Vectorized re-extraction of numeric fields from scraped text columns.
+
+Re-derives ``price``, ``area_sqft``, ``bhk`` and ``age_years`` from the
+``price_text``, ``area_text`` and ``title`` columns for a whole frame at once
+with ``Series.str.extract`` and NumPy unit multipliers, instead of the
+per-row ``extract_*`` helpers. Every rule also reports the rows whose text was
+present but could not be parsed.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+PRICE_REGEX = r'(?P<value>\d[\d,]*\.?\d*)\s*(?P<unit>crores?|cr|lakhs?|lacs?|l|k)?\b'
+AREA_REGEX = (r'(?P<value>\d[\d,]*\.?\d*)\s*'
+              r'(?P<unit>sq\.?\s*(?:ft|feet)|sq\.?\s*(?:yrd|yd|yards?)|sq\.?\s*(?:m|mt|mtr|meters?)|ft)?\b')
+BHK_REGEX = r'(?P<bhk>\d+)\s*bhk'
+AGE_REGEX = r'(?P<age>\d+)\s*years?\s*old'
+# Text that states an age at all; only such rows count as age failures (most titles have none)
+AGE_PHRASE_REGEX = r'years?\s*old|construction|ready\s*to\s*move'
+
+# Unit name (lowercased, letters only) -> multiplier into rupees / sqft
+PRICE_UNITS = {'': 1.0, 'k': 1e3, 'l': 1e5, 'lac': 1e5, 'lacs': 1e5, 'lakh': 1e5, 'lakhs': 1e5,
+               'cr': 1e7, 'crore': 1e7, 'crores': 1e7}
+AREA_UNITS = {'': 1.0, 'ft': 1.0, 'sqft': 1.0, 'sqfeet': 1.0, 'sqm': 10.764, 'sqmt': 10.764,
+              'sqmtr': 10.764, 'sqmeter': 10.764, 'sqmeters': 10.764, 'sqyrd': 9.0, 'sqyd': 9.0,
+              'sqyard': 9.0, 'sqyards': 9.0}
+
+# Unit-less prices below this are listed in lakhs (the "95.0" rows in raw_processed.csv)
+LAKH_THRESHOLD = 10000
+
+
+@dataclass
+class ExtractionReport:
+    """Rows each rule could not parse, keyed by rule name"""
+    failures: dict = field(default_factory=dict)
+    missing: dict = field(default_factory=dict)
+    inferred: dict = field(default_factory=dict)
+
+    def summary(self):
+        rules = list(dict.fromkeys([*self.failures, *self.inferred]))
+        return pd.DataFrame({
+            'missing_text': [len(self.missing.get(rule, [])) for rule in rules],
+            'unparsed': [len(self.failures.get(rule, [])) for rule in rules],
+            'unit_inferred': [len(self.inferred.get(rule, [])) for rule in rules],
+        }, index=pd.Index(rules, name='rule'))
+
+
+def _has_text(text):
+    return text.notna() & (text.astype('string').str.strip().str.len() > 0)
+
+
+def _per_unique(func):
+    """
+    Run a text rule once per distinct string and broadcast the result back.
+
+    Scraped text columns repeat heavily (the same "1.2 Cr" or "3 BHK ..." on
+    thousands of rows), so factorizing first cuts the regex work to the number
+    of unique values. ``func`` returns one value (or one row of values) per
+    unique string; missing text maps to NaN.
+    """
+    def wrapper(text, *args, **kwargs):
+        codes, uniques = pd.factorize(text.astype('string'), use_na_sentinel=True)
+        values = np.asarray(func(pd.Series(uniques, dtype='string'), *args, **kwargs), dtype=float)
+        values = np.concatenate([values, np.full((1,) + values.shape[1:], np.nan)])  # code -1 -> NaN
+        return values[codes]
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+def _scaled_number(text, regex, units):
+    """Extract the first number and scale it by its unit; unknown units give NaN"""
+    parts = text.str.extract(regex, flags=2)  # re.IGNORECASE
+    value = pd.to_numeric(parts['value'].str.replace(',', '', regex=False), errors='coerce').to_numpy(float)
+    unit = parts['unit'].fillna('').str.lower().str.replace(r'[^a-z]', '', regex=True)
+    multiplier = unit.map(units).to_numpy(dtype=float, na_value=np.nan)
+    return value * multiplier, unit.to_numpy() == ''
+
+
+@_per_unique
+def _price_and_inferred(price_text, infer_lakhs):
+    price, unitless = _scaled_number(price_text, PRICE_REGEX, PRICE_UNITS)
+    inferred = unitless & (price < LAKH_THRESHOLD) if infer_lakhs else np.zeros(len(price), dtype=bool)
+    return np.column_stack([np.where(inferred, price * 1e5, price), inferred])
+
+
+def extract_price(price_text, infer_lakhs=True):
+    """Vectorized price in rupees; returns (values, rows where the lakh unit was inferred)"""
+    values = _price_and_inferred(price_text, infer_lakhs)
+    inferred = values[:, 1] == 1
+    return pd.Series(values[:, 0], index=price_text.index, name='price'), price_text.index[inferred]
+
+
+@_per_unique
+def _area(area_text):
+    area, _ = _scaled_number(area_text, AREA_REGEX, AREA_UNITS)
+    return area
+
+
+def extract_area(area_text):
+    """Vectorized area in sqft"""
+    return pd.Series(_area(area_text), index=area_text.index, name='area_sqft')
+
+
+@_per_unique
+def _bhk(title):
+    return pd.to_numeric(title.str.extract(BHK_REGEX, flags=2)['bhk'], errors='coerce').to_numpy(float)
+
+
+def extract_bhk(title):
+    """Vectorized number of BHK from titles"""
+    return pd.Series(_bhk(title), index=title.index, name='bhk')
+
+
+@_per_unique
+def _age(text):
+    text = text.str.lower()
+    years = pd.to_numeric(text.str.extract(AGE_REGEX)['age'], errors='coerce').to_numpy(float)
+    new = text.str.contains('new construction|under construction', regex=True).fillna(False).to_numpy(bool)
+    ready = text.str.contains('ready to move', regex=False).fillna(False).to_numpy(bool)
+    return np.select([new, ready], [0.0, 1.0], default=years)
+
+
+def extract_age(text):
+    """Vectorized property age: 0 for new/under construction, 1 for ready to move, else 'N years old'"""
+    return pd.Series(_age(text), index=text.index, name='age_years')
+
+
+def reextract_fields(df, price_col='price_text', area_col='area_text', title_col='title',
+                     age_col='title', infer_lakhs=True):
+    """
+    Re-derive ``price``, ``area_sqft``, ``bhk`` and ``age_years`` for a whole frame.
+
+    Returns a copy of ``df`` with the derived columns and an ``ExtractionReport``.
+    Where a rule cannot parse a row, the existing column value (if any) is kept;
+    with ``infer_lakhs`` a kept bare ``price`` below ``LAKH_THRESHOLD`` (e.g.
+    ``95.0``) is read as lakhs, like a unit-less ``price_text``. Text without
+    an age phrase counts as missing for ``age_years``, not as a failure.
+    Source columns missing from ``df`` are skipped.
+    """
+    out = df.copy()
+    report = ExtractionReport()
+    rules = [
+        ('price', price_col, lambda s: extract_price(s, infer_lakhs), None),
+        ('area_sqft', area_col, lambda s: (extract_area(s), None), None),
+        ('bhk', title_col, lambda s: (extract_bhk(s), None), None),
+        ('age_years', age_col, lambda s: (extract_age(s), None), AGE_PHRASE_REGEX),
+    ]
+    for target, source, extract, phrase in rules:
+        if source in df.columns:
+            text = df[source]
+            derived, inferred = extract(text)
+            has_text = _has_text(text)
+            if phrase is not None:
+                has_text &= text.astype('string').str.contains(phrase, case=False, regex=True).fillna(False)
+            report.missing[target] = df.index[~has_text.to_numpy(bool)]
+            report.failures[target] = df.index[(has_text & derived.isna()).to_numpy(bool)]
+        elif target in df.columns:
+            derived, inferred = pd.Series(np.nan, index=df.index, name=target), None
+        else:
+            continue
+        if target in df.columns:
+            existing = pd.to_numeric(df[target], errors='coerce')
+            if target == 'price' and infer_lakhs:
+                bare = derived.isna() & (existing > 0) & (existing < LAKH_THRESHOLD)
+                existing = existing.mask(bare, existing * 1e5)
+                bare = df.index[bare.to_numpy(bool)]
+                inferred = bare if inferred is None else inferred.union(bare)
+            derived = derived.fillna(existing)
+        if inferred is not None:
+            report.inferred[target] = inferred
+        out[target] = derived
+
+    if 'price' in out.columns and 'area_sqft' in out.columns:
+        out['price_per_sqft'] = out['price'] / out['area_sqft']
+    return out, report
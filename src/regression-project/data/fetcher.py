@@ -0,0 +1,315 @@
+"""
+Concurrent page fetcher for the housing scraper.
+
+A pool of worker threads, each owning one reusable backend (a Chrome driver
+or a plain HTTP session), pulls page numbers from a shared work queue. All
+workers draw from one token-bucket rate limiter, and failed pages are
+re-queued up to ``max_retries`` times. ``benchmark`` serves a directory of
+saved snapshots over a local HTTP server to measure pages per second offline.
+"""
+import functools
+import http.server
+import queue
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36')
+
+
+class EmptyPageError(Exception):
+    """Raised by a backend when a page loaded but had no listings (not retried)"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursts up to ``capacity``"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event=None):
+        """Block until a token is available; returns False if ``stop_event`` is set first"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+class HttpBackend:
+    """Fetch pages with plain HTTP requests"""
+
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+
+    def fetch(self, url):
+        request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return response.read().decode('utf-8', errors='replace')
+
+    def close(self):
+        pass
+
+
+def make_chrome_driver(headless=False):
+    """Create a stealth Chrome driver configured like the original scraper"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium_stealth import stealth
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument('--headless')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument(f'--user-agent={USER_AGENT}')
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    prefs = {"profile.managed_default_content_settings.images": 2}
+    options.add_experimental_option("prefs", prefs)
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+
+    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    stealth(driver,
+            languages=["en-US", "en"],
+            vendor="Google Inc.",
+            platform="Win32",
+            webgl_vendor="Intel Inc.",
+            renderer="Intel Iris OpenGL Engine",
+            fix_hairline=True)
+    driver.set_page_load_timeout(30)
+    return driver
+
+
+class ChromeBackend:
+    """Fetch rendered pages with one reusable Chrome driver"""
+
+    def __init__(self, headless=False, wait_selector="article[data-listingid]", wait_timeout=20):
+        self.driver = make_chrome_driver(headless)
+        self.wait_selector = wait_selector
+        self.wait_timeout = wait_timeout
+        self._cookies_handled = False
+
+    def _handle_cookie_consent(self):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        try:
+            cookie_button = WebDriverWait(self.driver, 5).until(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, "[data-testid='cookie-consent-button']"))
+            )
+            cookie_button.click()
+        except Exception:
+            pass
+        self._cookies_handled = True
+
+    def fetch(self, url):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        self.driver.get(url)
+        if not self._cookies_handled:
+            self._handle_cookie_consent()
+        try:
+            WebDriverWait(self.driver, self.wait_timeout).until(
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, self.wait_selector))
+            )
+        except TimeoutException:
+            raise EmptyPageError(url)
+        return self.driver.page_source
+
+    def close(self):
+        self.driver.quit()
+
+
+@dataclass
+class FetchResult:
+    page: int
+    url: str
+    html: str = None
+    attempts: int = 0
+    error: str = None
+    elapsed: float = 0.0
+    empty: bool = False  # The page loaded but had no listings (past the last page)
+
+
+class PageFetcher:
+    """
+    Fetch pages concurrently with ``workers`` backends behind one rate limiter.
+
+    ``backend_factory`` is called once per worker thread, so each worker keeps
+    its own driver or session for its whole lifetime. Use as a context
+    manager, or call ``close`` when done.
+    """
+
+    def __init__(self, backend_factory=HttpBackend, workers=4, rate=1.0, burst=1,
+                 max_retries=3, retry_delay=1.0):
+        self.backend_factory = backend_factory
+        self.workers = workers
+        self.limiter = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _worker(self, url_template, tasks, results):
+        try:
+            backend = self.backend_factory()
+        except Exception as e:
+            # Without a backend this worker cannot take pages; report it and leave the queue to others
+            results.put(('worker_failed', str(e)))
+            return
+        try:
+            while not self._stop.is_set():
+                try:
+                    page, attempt = tasks.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if page is None:
+                    break
+                if not self.limiter.acquire(self._stop):
+                    break
+                url = url_template.format(page)
+                start = time.perf_counter()
+                try:
+                    html = backend.fetch(url)
+                    results.put(FetchResult(page, url, html, attempt + 1,
+                                            elapsed=time.perf_counter() - start))
+                except EmptyPageError:
+                    results.put(FetchResult(page, url, None, attempt + 1, 'no listings found',
+                                            time.perf_counter() - start, empty=True))
+                except Exception as e:
+                    if attempt + 1 < self.max_retries:
+                        if self._stop.wait(self.retry_delay * (attempt + 1)):
+                            break
+                        tasks.put((page, attempt + 1))
+                    else:
+                        results.put(FetchResult(page, url, None, attempt + 1, str(e),
+                                                time.perf_counter() - start))
+        finally:
+            backend.close()
+
+    def fetch(self, pages, url_template):
+        """Yield a ``FetchResult`` per page as soon as it finishes (not in page order)"""
+        pages = list(pages)
+        tasks = queue.Queue()
+        results = queue.Queue()
+        for page in pages:
+            tasks.put((page, 0))
+
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._worker, args=(url_template, tasks, results), daemon=True)
+            for _ in range(min(self.workers, len(pages)))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        remaining = len(pages)
+        failed_workers = 0
+        try:
+            while remaining:
+                try:
+                    result = results.get(timeout=0.5)
+                except queue.Empty:
+                    if not any(thread.is_alive() for thread in self._threads):
+                        raise RuntimeError('All fetch workers exited with pages still queued')
+                    continue
+                if isinstance(result, tuple):
+                    failed_workers += 1
+                    if failed_workers == len(self._threads):
+                        raise RuntimeError(f'No fetch backend could be started: {result[1]}')
+                    continue
+                remaining -= 1
+                yield result
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop all workers and release their backends"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_directory(directory):
+    """Serve a directory on a local port; yields the base URL"""
+    handler = functools.partial(_QuietHandler, directory=str(directory))
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def benchmark(snapshot_dir, workers=4, rate=1000.0, burst=None):
+    """
+    Fetch every ``page_*.html`` snapshot from a local server and report throughput.
+
+    Returns a dict with the page count, failures, wall time and pages per second.
+    """
+    pages = sorted(int(path.stem.split('_')[1]) for path in Path(snapshot_dir).glob('page_*.html'))
+    with serve_directory(snapshot_dir) as base_url:
+        fetcher = PageFetcher(HttpBackend, workers=workers, rate=rate, burst=burst or workers)
+        start = time.perf_counter()
+        results = list(fetcher.fetch(pages, base_url + '/page_{:04d}.html'))
+        elapsed = time.perf_counter() - start
+    return {
+        'pages': len(results),
+        'failed': sum(result.error is not None for result in results),
+        'seconds': elapsed,
+        'pages_per_second': len(results) / elapsed if elapsed else float('inf'),
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the page fetcher against saved snapshots')
+    parser.add_argument('snapshot_dir')
+    parser.add_argument('-w', '--workers', type=int, default=4)
+    parser.add_argument('-r', '--rate', type=float, default=1000.0, help='Requests per second')
+    args = parser.parse_args()
+
+    stats = benchmark(args.snapshot_dir, args.workers, args.rate)
+    print(f"{stats['pages']} pages ({stats['failed']} failed) in {stats['seconds']:.2f}s "
+          f"-> {stats['pages_per_second']:.1f} pages/s")
@@ -0,0 +1,186 @@
+"""
+Typed, cached loading of the housing CSVs.
+
+Columns are read with a declared schema (float32 prices and areas, small
+nullable ints for counts, categorical locations) instead of dtype inference.
+The first read of a CSV writes a columnar cache of ``.npy`` files keyed by
+the CSV's content hash. Later loads memory-map those files and build the
+frame on top of them without copying, so repeated loads of an unchanged file
+skip CSV parsing entirely.
+"""
+import hashlib
+import json
+import shutil
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import CACHE_DIR, DATA_DIR
+from utils.helpers import cached_file_sha256
+
+HOUSING_SCHEMA = {
+    'listing_id': 'string',
+    'title': 'string',
+    'price_text': 'string',
+    'area_text': 'string',
+    'location': 'category',
+    'location_clean': 'category',
+    'price': 'float32',
+    'area_sqft': 'float32',
+    'price_per_sqft': 'float32',
+    'bhk': 'Int8',
+    'parking': 'Int8',
+    'age_years': 'Int8',
+    'page_scraped': 'Int16',
+}
+
+CACHE_VERSION = 1
+
+
+def _csv_dtypes(schema, columns):
+    """dtypes to hand to read_csv; nullable ints are read as float first (CSVs store them as '3.0')"""
+    dtypes = {}
+    for column in columns:
+        dtype = schema.get(column)
+        if dtype is None:
+            continue
+        if str(dtype).startswith(('Int', 'UInt')):
+            dtypes[column] = 'float64'
+        elif dtype == 'string':
+            dtypes[column] = 'object'
+        else:
+            dtypes[column] = dtype
+    return dtypes
+
+
+def apply_schema(df, schema=None):
+    """Cast the columns of ``df`` that appear in ``schema`` to their declared dtype"""
+    schema = HOUSING_SCHEMA if schema is None else schema
+    casts = {}
+    for column, dtype in schema.items():
+        if column not in df.columns or str(df[column].dtype) == str(dtype):
+            continue
+        if dtype == 'string':
+            continue  # Text stays as object; it is only used for display and re-extraction
+        casts[column] = dtype
+    return df.astype(casts) if casts else df
+
+
+def read_csv_typed(path, schema=None, usecols=None, **kwargs):
+    """Read a CSV with the declared schema applied (no caching)"""
+    schema = HOUSING_SCHEMA if schema is None else schema
+    columns = usecols or pd.read_csv(path, nrows=0).columns
+    df = pd.read_csv(path, usecols=usecols, dtype=_csv_dtypes(schema, columns), **kwargs)
+    return apply_schema(df, schema)
+
+
+def iter_csv_chunks(path, chunksize=100000, schema=None, usecols=None, **kwargs):
+    """Yield typed frames of at most ``chunksize`` rows; memory is bounded by one chunk"""
+    schema = HOUSING_SCHEMA if schema is None else schema
+    columns = usecols or pd.read_csv(path, nrows=0).columns
+    reader = pd.read_csv(path, usecols=usecols, dtype=_csv_dtypes(schema, columns), chunksize=chunksize, **kwargs)
+    with reader:
+        for chunk in reader:
+            yield apply_schema(chunk, schema)
+
+
+def write_column_store(df, cache_dir):
+    """Write ``df`` as one .npy file per column (plus masks/categories) into a new ``cache_dir``"""
+    tmp_dir = cache_dir.with_name(f'{cache_dir.name}.{uuid.uuid4().hex}.tmp')
+    tmp_dir.mkdir(parents=True)
+    meta = {'version': CACHE_VERSION, 'rows': len(df), 'columns': []}
+    for i, column in enumerate(df.columns):
+        series = df[column]
+        dtype = series.dtype
+        entry = {'name': column, 'file': f'{i}.npy'}
+        if isinstance(dtype, pd.CategoricalDtype):
+            entry['kind'] = 'category'
+            entry['categories'] = series.cat.categories.tolist()
+            entry['ordered'] = bool(series.cat.ordered)
+            np.save(tmp_dir / entry['file'], series.cat.codes.to_numpy())
+        elif isinstance(dtype, pd.core.arrays.masked.BaseMaskedDtype):
+            entry['kind'] = 'masked'
+            entry['dtype'] = str(dtype)
+            mask = series.isna().to_numpy()
+            np.save(tmp_dir / entry['file'], series.array.to_numpy(dtype=dtype.numpy_dtype, na_value=0))
+            np.save(tmp_dir / f'{i}.mask.npy', mask)
+        elif dtype.kind in 'biuf':
+            entry['kind'] = 'numpy'
+            np.save(tmp_dir / entry['file'], series.to_numpy())
+        else:
+            # Text: store codes + uniques, decoded back to strings on load
+            entry['kind'] = 'text'
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            entry['categories'] = [str(u) for u in uniques]
+            np.save(tmp_dir / entry['file'], codes.astype(np.int32))
+        meta['columns'].append(entry)
+    (tmp_dir / 'meta.json').write_text(json.dumps(meta))
+    try:
+        tmp_dir.rename(cache_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir)  # Another process won the race; its cache is identical
+
+
+def read_column_store(cache_dir, columns=None):
+    """Build a frame on memory-mapped cache files; numeric and categorical columns are zero-copy"""
+    meta = json.loads((cache_dir / 'meta.json').read_text())
+    data = {}
+    for entry in meta['columns']:
+        name = entry['name']
+        if columns is not None and name not in columns:
+            continue
+        # Copy-on-write maps: reads share the page cache, writes stay private to this process
+        values = np.load(cache_dir / entry['file'], mmap_mode='c')
+        kind = entry['kind']
+        if kind == 'category':
+            data[name] = pd.Categorical.from_codes(
+                values, dtype=pd.CategoricalDtype(entry['categories'], entry.get('ordered', False)), validate=False)
+        elif kind == 'masked':
+            mask = np.load(cache_dir / entry['file'].replace('.npy', '.mask.npy'), mmap_mode='c')
+            array_type = pd.api.types.pandas_dtype(entry['dtype']).construct_array_type()
+            data[name] = array_type(values, mask)
+        elif kind == 'text':
+            uniques = np.array(entry['categories'] + [None], dtype=object)
+            data[name] = uniques[np.asarray(values)]
+        else:
+            data[name] = values
+    frame = pd.DataFrame(data, copy=False)
+    if columns is not None:
+        frame = frame[[column for column in columns if column in frame.columns]]
+    return frame
+
+
+def cache_dir_for(path, schema=None, cache_root=None):
+    """Cache directory of a CSV, keyed by its content hash and the schema it was read with"""
+    cache_root = Path(cache_root or CACHE_DIR)
+    schema = HOUSING_SCHEMA if schema is None else schema
+    sha = cached_file_sha256(path, cache_root / 'hashes.json')
+    schema_sha = hashlib.sha256(json.dumps(schema, sort_keys=True, default=str).encode()).hexdigest()
+    return cache_root / f'{Path(path).stem}-{sha[:16]}-{schema_sha[:8]}-v{CACHE_VERSION}'
+
+
+def load_csv(path, schema=None, columns=None, use_cache=True, cache_root=None):
+    """
+    Load a CSV with the declared schema, via the columnar cache.
+
+    The first call parses the CSV and writes the cache; later calls for the
+    same file content memory-map the cache instead of parsing.
+    """
+    if not use_cache:
+        return read_csv_typed(path, schema, usecols=columns)
+    cache_dir = cache_dir_for(path, schema, cache_root)
+    if not (cache_dir / 'meta.json').exists():
+        write_column_store(read_csv_typed(path, schema), cache_dir)
+    return read_column_store(cache_dir, columns)
+
+
+def load_housing(name='housing_cleaned', **kwargs):
+    """Load ``data/<name>.csv`` (e.g. 'housing_cleaned' or 'raw_processed')"""
+    return load_csv(DATA_DIR / f'{name}.csv', **kwargs)
+
+
+def clear_cache(cache_root=None):
+    """Delete every cached column store"""
+    shutil.rmtree(cache_root or CACHE_DIR, ignore_errors=True)
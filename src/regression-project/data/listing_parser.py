@@ -0,0 +1,255 @@
+"""
+Page-level parser for housing.com search result pages.
+
+Takes the full HTML of a results page (``driver.page_source`` or a saved
+snapshot) and extracts every ``article[data-listingid]`` card from a single
+parse tree, so the scraper no longer needs a WebDriver round-trip and a fresh
+BeautifulSoup tree per card. Saved snapshots can be re-parsed offline, in a
+process pool, whenever the field rules change.
+"""
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+ARTICLE_SELECTOR = "article[data-listingid]"
+SNAPSHOT_PATTERN = re.compile(r'page_(\d+)\.html?$')
+
+# Only build tree nodes for listing cards, everything else on the page is skipped
+ARTICLE_STRAINER = SoupStrainer('article', attrs={'data-listingid': True})
+
+# Field patterns, tried in order (first match wins)
+PRICE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'₹\s*([\d.,]+)\s*(Lac|Lakh|Cr|Crore)',
+    r'([\d.,]+)\s*(Lac|Lakh|Cr|Crore)',
+    r'₹\s*([\d.,]+)',
+)]
+AREA_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'([\d.,]+)\s*(sq\.?\s*ft|sqft|sq\s*feet)',
+    r'([\d.,]+)\s*(sq\.?\s*m|sqm)',
+    r'([\d.,]+)\s*ft',
+)]
+LOCATION_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'(Sector\s+\d+[A-Z]*)',
+    r'(Greater\s+Noida)',
+    r'(Noida)',
+    r'(Gurgaon)',
+    r'(Delhi)',
+    r'(Faridabad)',
+    r'(Ghaziabad)',
+)]
+BHK_PATTERN = re.compile(r'(\d+)\s*BHK', re.IGNORECASE)
+AGE_PATTERN = re.compile(r'(\d+)\s*year[s]?\s*old', re.IGNORECASE)
+PARKING_PATTERN = re.compile(r'(\d+)\s*(parking|car)', re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r'([\d.]+)')
+AREA_NUMBER_PATTERN = re.compile(r'([\d,]+\.?\d*)')
+
+
+def extract_price(price_text):
+    """Extract numeric price value from price text"""
+    if not price_text:
+        return None
+    price_text = price_text.replace(',', '').lower()
+    match = NUMBER_PATTERN.search(price_text)
+    try:
+        value = float(match.group(1))
+    except (AttributeError, ValueError):
+        return None
+    if 'cr' in price_text:
+        return value * 10000000
+    elif 'lac' in price_text or 'lakh' in price_text:
+        return value * 100000
+    return value
+
+
+def extract_area(area_text):
+    """Extract numeric area value from area text"""
+    if not area_text:
+        return None
+    match = AREA_NUMBER_PATTERN.search(area_text)
+    try:
+        value = float(match.group(1).replace(',', ''))
+    except (AttributeError, ValueError):
+        return None
+    area_text = area_text.lower()
+    if 'sqft' in area_text or 'sq ft' in area_text:
+        return value
+    elif 'sqm' in area_text:
+        return value * 10.764  # Convert sqm to sqft
+    elif 'sqyrd' in area_text or 'sq yrd' in area_text:
+        return value * 9  # Convert sq yard to sq ft
+    return value
+
+
+def extract_bhk(title):
+    """Extract number of BHK from title"""
+    if not title:
+        return None
+    match = BHK_PATTERN.search(title)
+    return int(match.group(1)) if match else None
+
+
+def extract_age(text):
+    """Extract property age from text"""
+    if not text:
+        return None
+    lowered = text.lower()
+    if 'new construction' in lowered or 'under construction' in lowered:
+        return 0
+    elif 'ready to move' in lowered:
+        return 1
+    match = AGE_PATTERN.search(lowered)
+    return int(match.group(1)) if match else None
+
+
+def clean_text(text):
+    """Clean and normalize text"""
+    if not text:
+        return None
+    return ' '.join(text.strip().split())
+
+
+def _first_match(patterns, text):
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            return clean_text(match.group())
+    return None
+
+
+def parse_article(article, page=None):
+    """Extract one listing dict from an ``article`` tag, or None if it has no title and price"""
+    listing_id = article.get('data-listingid')
+    all_text = article.get_text()
+
+    # Find title in link tags
+    title = None
+    for link in article.find_all('a'):
+        link_text = clean_text(link.get_text())
+        if link_text and len(link_text) > 10:  # Likely a property title
+            title = link_text
+            break
+
+    price = _first_match(PRICE_PATTERNS, all_text)
+    area = _first_match(AREA_PATTERNS, all_text)
+    location = _first_match(LOCATION_PATTERNS, all_text)
+
+    # Skip if essential data is missing
+    if not title and not price:
+        return None
+
+    bhk_match = BHK_PATTERN.search(all_text)
+    bhk = int(bhk_match.group(1)) if bhk_match else None
+
+    parking = None
+    parking_match = PARKING_PATTERN.search(all_text)
+    if parking_match:
+        parking = int(parking_match.group(1))
+    elif 'parking' in all_text.lower():
+        parking = 1
+
+    return {
+        "listing_id": listing_id,
+        "title": title,
+        "price_text": price,
+        "area_text": area,
+        "location": location,
+        "price": extract_price(price) if price else None,
+        "area_sqft": extract_area(area) if area else None,
+        "bhk": (bhk or extract_bhk(title)) if title else None,
+        "age_years": extract_age(all_text),
+        "parking": parking,
+        "page_scraped": page,
+    }
+
+
+def parse_page(html, page=None, seen=None):
+    """
+    Parse every listing card on one results page.
+
+    ``seen`` is an optional set of listing ids; cards already in it are skipped
+    and new ids are added to it, so it can be shared across pages.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=ARTICLE_STRAINER)
+    records = []
+    for article in soup.find_all('article', attrs={'data-listingid': True}):
+        listing_id = article.get('data-listingid')
+        if seen is not None:
+            if listing_id in seen:
+                continue
+            seen.add(listing_id)
+        record = parse_article(article, page)
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def snapshot_path(snapshot_dir, page):
+    """Path of the saved HTML snapshot for a page number"""
+    return Path(snapshot_dir) / f'page_{page:04d}.html'
+
+
+def save_snapshot(html, snapshot_dir, page):
+    """Save a results page so it can be re-parsed without launching Chrome"""
+    path = snapshot_path(snapshot_dir, page)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(html, encoding='utf-8')
+    return path
+
+
+def parse_snapshot(path):
+    """Parse one saved snapshot, taking the page number from its file name"""
+    path = Path(path)
+    match = SNAPSHOT_PATTERN.search(path.name)
+    page = int(match.group(1)) if match else None
+    return parse_page(path.read_text(encoding='utf-8'), page)
+
+
+def parse_snapshot_dir(snapshot_dir, workers=None, chunksize=8, dedupe=True):
+    """
+    Re-parse every ``page_*.html`` snapshot in a directory.
+
+    With ``workers`` > 1 pages are parsed in a process pool. Results are
+    returned in page order and, like the scraper, only the first occurrence of
+    each listing id is kept when ``dedupe`` is set.
+    """
+    paths = sorted(Path(snapshot_dir).glob('page_*.htm*'))
+    if workers and workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pages = list(executor.map(parse_snapshot, paths, chunksize=chunksize))
+    else:
+        pages = [parse_snapshot(path) for path in paths]
+
+    records = []
+    seen = set()
+    for page_records in pages:
+        for record in page_records:
+            if dedupe:
+                if record['listing_id'] in seen:
+                    continue
+                seen.add(record['listing_id'])
+            records.append(record)
+    return records
+
+
+if __name__ == '__main__':
+    import argparse
+
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description='Re-parse saved housing.com result pages')
+    parser.add_argument('snapshot_dir', help='Directory of page_*.html snapshots')
+    parser.add_argument('-o', '--output', default='housing_data_reparsed.csv')
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    records = parse_snapshot_dir(args.snapshot_dir, workers=args.workers)
+    pd.DataFrame(records).to_csv(args.output, index=False)
+    print(f"Parsed {len(records)} listings into {args.output}")
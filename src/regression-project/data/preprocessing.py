@@ -0,0 +1,210 @@
+"""
+Model preprocessing: a fitted outlier capper and the ColumnTransformer built on it.
+
+The notebooks drop outliers with hard-coded ranges and a per-BHK Python loop.
+``OutlierCapper`` instead learns IQR or MAD bounds per column, optionally per
+group (e.g. per BHK), from one sort of the training rows, and applies them with
+an in-place ``np.clip`` on a float32 array. The bounds are plain arrays, saved
+as JSON next to the model, so training and serving cap values identically.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from utils.helpers import write_json_atomic
+
+DEFAULT_FACTORS = {'iqr': 1.5, 'mad': 3.5}
+MAD_SCALE = 1.4826  # MAD -> standard deviation for normal data
+
+# Model inputs available for every scraped listing; price-derived features would leak the target
+NUMERIC_FEATURES = ['area_sqft', 'bhk', 'parking', 'area_per_bhk', 'parking_ratio']
+CATEGORICAL_FEATURES = ['area_category']
+
+
+def _bounds(block, method, factor):
+    """(lower, upper) per column of a 2-D block, ignoring NaNs"""
+    with np.errstate(all='ignore'):  # all-NaN columns give NaN bounds, i.e. no capping
+        if method == 'iqr':
+            q1, q3 = np.nanquantile(block, [0.25, 0.75], axis=0)
+            spread = factor * (q3 - q1)
+            return q1 - spread, q3 + spread
+        median = np.nanmedian(block, axis=0)
+        spread = factor * MAD_SCALE * np.nanmedian(np.abs(block - median), axis=0)
+        return median - spread, median + spread
+
+
+class OutlierCapper(BaseEstimator, TransformerMixin):
+    """
+    Clip numeric columns to robust bounds learned in ``fit``.
+
+    ``method`` is ``'iqr'`` (``[Q1 - k*IQR, Q3 + k*IQR]``) or ``'mad'``
+    (``median +/- k * 1.4826 * MAD``). With ``group`` set, bounds are learned
+    per value of that column; groups with fewer than ``min_group_size`` rows and
+    groups unseen at fit time use the global bounds. The group column itself
+    is never capped. ``transform`` returns a float32 array of ``columns``;
+    a float32 ndarray input is capped in place unless ``copy`` is set.
+
+    >>> capper = OutlierCapper(['price', 'area_sqft'], group='bhk').fit(train)
+    >>> X = capper.transform(test)
+    """
+
+    def __init__(self, columns=None, method='iqr', factor=None, group=None, min_group_size=30, copy=False):
+        self.columns = columns
+        self.method = method
+        self.factor = factor
+        self.group = group
+        self.min_group_size = min_group_size
+        self.copy = copy
+
+    def _columns(self, X):
+        if self.columns is not None:
+            return list(self.columns)
+        if isinstance(X, pd.DataFrame):
+            return list(X.select_dtypes('number').columns)
+        return list(range(X.shape[1]))
+
+    def _array(self, X, copy):
+        """``columns_`` of X as a float32 array (the input itself when possible)"""
+        if isinstance(X, pd.DataFrame):
+            out = np.empty((len(X), len(self.columns_)), dtype=np.float32)
+            for j, column in enumerate(self.columns_):
+                out[:, j] = X[column].to_numpy(dtype=np.float32, na_value=np.nan)
+            return out
+        X = np.asarray(X)
+        if X.dtype == np.float32 and not copy and list(self.columns_) == list(range(X.shape[1])):
+            return X
+        return np.array(X[:, self.columns_], dtype=np.float32)
+
+    def _group_values(self, X):
+        if self.group is None:
+            return None
+        if isinstance(X, pd.DataFrame):
+            return X[self.group].to_numpy(dtype=float, na_value=np.nan)
+        return np.asarray(X)[:, self.group].astype(float)
+
+    def _group_codes(self, groups):
+        """Row index into the bounds table; the last row holds the global bounds"""
+        n_groups = len(self.groups_)
+        if groups is None or n_groups == 0:
+            return None
+        pos = np.minimum(np.searchsorted(self.groups_, groups), n_groups - 1)
+        return np.where(self.groups_[pos] == groups, pos, n_groups)
+
+    def fit(self, X, y=None):
+        if self.method not in DEFAULT_FACTORS:
+            raise ValueError(f"method must be one of {sorted(DEFAULT_FACTORS)}, got {self.method!r}")
+        factor = DEFAULT_FACTORS[self.method] if self.factor is None else self.factor
+        self.columns_ = self._columns(X)
+        values = self._array(X, copy=True).astype(float)
+        lower, upper = _bounds(values, self.method, factor)
+
+        groups = self._group_values(X)
+        group_keys = np.empty(0)
+        group_lower, group_upper = [], []
+        if groups is not None:
+            # One stable sort puts every group in a contiguous block
+            order = np.argsort(groups, kind='stable')
+            sorted_groups = groups[order]
+            keys, starts, counts = np.unique(sorted_groups, return_index=True, return_counts=True)
+            big = ~np.isnan(keys) & (counts >= self.min_group_size)
+            sorted_values = values[order]
+            for start, count in zip(starts[big], counts[big]):
+                block_lower, block_upper = _bounds(sorted_values[start:start + count], self.method, factor)
+                group_lower.append(block_lower)
+                group_upper.append(block_upper)
+            group_keys = keys[big]
+
+        self.groups_ = group_keys
+        self.lower_ = np.vstack(group_lower + [lower]).astype(np.float32)
+        self.upper_ = np.vstack(group_upper + [upper]).astype(np.float32)
+        self._fix_group_column()
+        return self
+
+    def _fix_group_column(self):
+        # The group column would otherwise be clipped to its own value range
+        if self.group in self.columns_:
+            j = self.columns_.index(self.group)
+            self.lower_[:, j], self.upper_[:, j] = -np.inf, np.inf
+        # NaN bounds (all-NaN columns) mean no capping
+        np.nan_to_num(self.lower_, copy=False, nan=-np.inf, posinf=np.inf, neginf=-np.inf)
+        np.nan_to_num(self.upper_, copy=False, nan=np.inf, posinf=np.inf, neginf=-np.inf)
+
+    def transform(self, X):
+        out = self._array(X, copy=self.copy)
+        codes = self._group_codes(self._group_values(X))
+        if codes is None:
+            np.clip(out, self.lower_[-1], self.upper_[-1], out=out)
+        else:
+            np.clip(out, self.lower_[codes], self.upper_[codes], out=out)
+        return out
+
+    def outlier_mask(self, X):
+        """Boolean (rows x columns) mask of the values ``transform`` would change"""
+        values = self._array(X, copy=True)
+        codes = self._group_codes(self._group_values(X))
+        rows = -1 if codes is None else codes
+        return (values < self.lower_[rows]) | (values > self.upper_[rows])
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array([str(c) for c in self.columns_], dtype=object)
+
+    def bounds_frame(self):
+        """Learned bounds as a DataFrame indexed by group ('*' is the global row)"""
+        index = [*(f'{self.group}={g:g}' for g in self.groups_), '*']
+        lower = pd.DataFrame(self.lower_, index=index, columns=self.columns_).add_suffix('_lower')
+        upper = pd.DataFrame(self.upper_, index=index, columns=self.columns_).add_suffix('_upper')
+        return pd.concat([lower, upper], axis=1)
+
+    def to_dict(self):
+        return {
+            'params': self.get_params(),
+            'columns': self.columns_,
+            'groups': self.groups_.tolist(),
+            # JSON has no infinity; None stands for "unbounded"
+            'lower': np.where(np.isinf(self.lower_), None, self.lower_).tolist(),
+            'upper': np.where(np.isinf(self.upper_), None, self.upper_).tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        capper = cls(**state['params'])
+        capper.columns_ = list(state['columns'])
+        capper.groups_ = np.asarray(state['groups'], dtype=float)
+        capper.lower_ = np.array(state['lower'], dtype=float).astype(np.float32).reshape(len(capper.groups_) + 1, -1)
+        capper.upper_ = np.array(state['upper'], dtype=float).astype(np.float32).reshape(len(capper.groups_) + 1, -1)
+        capper._fix_group_column()
+        return capper
+
+    def save(self, path):
+        """Persist the fitted bounds as JSON (e.g. next to the model file)"""
+        write_json_atomic(path, self.to_dict())
+
+    @classmethod
+    def load(cls, path):
+        return cls.from_dict(json.loads(Path(path).read_text()))
+
+
+def build_preprocessor(numeric=NUMERIC_FEATURES, categorical=CATEGORICAL_FEATURES, cap_method='iqr',
+                       cap_group='bhk', scale=True):
+    """
+    ColumnTransformer for the regression models: capped, imputed (and scaled)
+    numeric columns plus one-hot categoricals.
+
+    The capper sees the group column as one of the numeric inputs, so
+    ``cap_group`` must be in ``numeric`` (or None).
+    """
+    steps = [('cap', OutlierCapper(list(numeric), method=cap_method, group=cap_group)),
+             ('impute', SimpleImputer(strategy='median'))]
+    if scale:
+        steps.append(('scale', StandardScaler()))
+    transformers = [('numeric', Pipeline(steps), list(numeric))]
+    if categorical:
+        transformers.append(('categorical', OneHotEncoder(handle_unknown='ignore'), list(categorical)))
+    return ColumnTransformer(transformers)
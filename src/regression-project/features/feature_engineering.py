@@ -0,0 +1,325 @@
+"""
+Housing feature engineering.
+
+Features are split into stateless ones, computed row by row and safe to run
+on any chunk, and the two stateful ones from ``create_housing_features``:
+the rare-location collapse and the quantile-based market segments. The
+statistics those need are collected in ``FeatureStats``, either exactly from
+one frame or incrementally, chunk by chunk, with ``FeatureStatsAccumulator``.
+
+``HousingFeatureTransformer`` wraps both as a scikit-learn transformer: ``fit``
+learns the statistics once, and ``transform`` applies them with NumPy only.
+Dicts and lists of dicts take a fast path that skips pandas entirely, for
+scoring single listings at serving time.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from data.cleaning import standardize_locations
+from utils.sketch import QuantileSketch, quantile_from_counts
+
+PRICE_BINS = [0, 2500000, 5000000, 10000000, 25000000, float('inf')]
+PRICE_LABELS = ['Budget', 'Mid-Range', 'Premium', 'Luxury', 'Ultra-Luxury']
+AREA_BINS = [0, 800, 1200, 1800, 2500, float('inf')]
+AREA_LABELS = ['Compact', 'Medium', 'Large', 'Very Large', 'Mansion']
+
+RARE_LOCATION_COUNT = 5  # Locations seen fewer times than this become 'Other'
+MAX_EXACT_VALUES = 1000000  # Distinct values per column counted for exact streaming quantiles
+
+# Market segment thresholds as (column, quantile)
+SEGMENT_QUANTILES = {
+    'price_high': ('price', 0.8),
+    'area_high': ('area_sqft', 0.8),
+    'price_low': ('price', 0.3),
+    'area_low': ('area_sqft', 0.4),
+}
+
+RAW_NUMERIC = ['price', 'area_sqft', 'bhk', 'parking', 'age_years']
+CATEGORY_FEATURES = {'price_category': PRICE_LABELS, 'area_category': AREA_LABELS}
+SEGMENT_LABELS = np.array(['Standard', 'High-End', 'Budget'], dtype=object)
+LOCATION_TYPE_LABELS = np.array(['Unknown', 'Named Area', 'Sector'], dtype=object)
+
+# Features computed from the target; unavailable when scoring a listing without a price
+PRICE_DERIVED = ['price_in_crores', 'price_category', 'price_per_bhk', 'price_efficiency', 'price_per_sqft']
+
+SECTOR_PATTERN = re.compile(r'Sector\s+(\d+)')
+
+
+def _values(df, column):
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return df[column].to_numpy(dtype=float, na_value=np.nan)
+
+
+def _bin_codes(values, bins):
+    """Codes of right-closed bins like ``pd.cut`` (-1 for NaN or out of range)"""
+    codes = np.searchsorted(bins, values, side='left') - 1
+    codes[(codes < 0) | (codes >= len(bins) - 1) | np.isnan(values)] = -1
+    return codes
+
+
+def stateless_feature_arrays(price, area, bhk, parking, age=None, price_per_sqft=None):
+    """
+    Every row-local feature as NumPy arrays.
+
+    Categorical features are returned as integer codes into ``CATEGORY_FEATURES``.
+    """
+    n = len(price)
+    age = np.full(n, np.nan) if age is None else age
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if price_per_sqft is None:
+            price_per_sqft = price / area
+        features = {
+            # Price-based features
+            'price_in_crores': price / 10000000,
+            'price_category': _bin_codes(price, PRICE_BINS),
+            # Area-based features
+            'area_category': _bin_codes(area, AREA_BINS),
+            'area_per_bhk': area / bhk,
+            # Efficiency metrics
+            'price_per_bhk': price / bhk,
+            'price_efficiency': price / (area * bhk),
+            # Property characteristics
+            'has_parking': (parking > 0).astype(int),
+            'parking_ratio': parking / bhk,
+            'is_new_property': (age <= 1).astype(int),
+            'bhk_area_ratio': bhk / area * 1000,  # BHK per 1000 sqft
+        }
+    features['luxury_score'] = ((area > 1500).astype(int) + (bhk >= 3).astype(int) +
+                                (parking > 0).astype(int) + (price_per_sqft > 8000).astype(int))
+    return features
+
+
+def add_stateless_features(df):
+    """
+    Add every feature of ``create_housing_features`` that depends only on the row itself.
+
+    Modifies and returns ``df``.
+    """
+    price_per_sqft = _values(df, 'price_per_sqft') if 'price_per_sqft' in df.columns else None
+    features = stateless_feature_arrays(_values(df, 'price'), _values(df, 'area_sqft'), _values(df, 'bhk'),
+                                        _values(df, 'parking'), _values(df, 'age_years'), price_per_sqft)
+    for name, values in features.items():
+        if name in CATEGORY_FEATURES:
+            values = pd.Categorical.from_codes(values, CATEGORY_FEATURES[name], ordered=True)
+        df[name] = values
+    return df
+
+
+@dataclass
+class FeatureStats:
+    """Statistics learned from the training data that the stateful features need"""
+    location_counts: dict = field(default_factory=dict)
+    thresholds: dict = field(default_factory=dict)
+    rare_count: int = RARE_LOCATION_COUNT
+
+    @property
+    def known_locations(self):
+        return sorted(loc for loc, count in self.location_counts.items() if count >= self.rare_count)
+
+    @classmethod
+    def from_frame(cls, df, rare_count=RARE_LOCATION_COUNT):
+        """Exact statistics of one in-memory frame"""
+        counts = {}
+        if 'location_clean' in df.columns:
+            counts = df['location_clean'].value_counts().to_dict()
+        thresholds = {name: float(df[column].quantile(q)) if column in df.columns else np.nan
+                      for name, (column, q) in SEGMENT_QUANTILES.items()}
+        return cls(counts, thresholds, rare_count)
+
+
+class FeatureStatsAccumulator:
+    """
+    Collect ``FeatureStats`` one chunk at a time in bounded memory.
+
+    Location counts are exact (one counter entry per distinct location).
+    Quantiles are exact too while a column has at most ``MAX_EXACT_VALUES``
+    distinct values, which listing prices and areas, clustered on round
+    numbers, stay well under; past that they come from a ``QuantileSketch``.
+    Exactness matters here because the thresholds are compared against
+    heavily tied values: a sketch estimate of 1205.98 instead of 1200 moves
+    every 1200 sq ft listing to another segment.
+    """
+
+    def __init__(self, rare_count=RARE_LOCATION_COUNT, alpha=0.005, max_exact_values=MAX_EXACT_VALUES):
+        self.rare_count = rare_count
+        self.max_exact_values = max_exact_values
+        self.location_counts = Counter()
+        self.sketches = {column: QuantileSketch(alpha) for column, _ in SEGMENT_QUANTILES.values()}
+        self.value_counts = {column: Counter() for column in self.sketches}  # None once too many values
+
+    def update(self, df):
+        if 'location_clean' in df.columns:
+            self.location_counts.update(df['location_clean'].value_counts().to_dict())
+        for column, sketch in self.sketches.items():
+            values = _values(df, column)
+            sketch.update(values)
+            counts = self.value_counts[column]
+            if counts is not None:
+                distinct, n = np.unique(values[~np.isnan(values)], return_counts=True)
+                counts.update(dict(zip(distinct.tolist(), n.tolist())))
+                if len(counts) > self.max_exact_values:
+                    self.value_counts[column] = None
+        return self
+
+    def finalize(self):
+        thresholds = {name: self.sketches[column].quantile(q) if self.value_counts[column] is None
+                      else quantile_from_counts(self.value_counts[column], q)
+                      for name, (column, q) in SEGMENT_QUANTILES.items()}
+        return FeatureStats(dict(self.location_counts), thresholds, self.rare_count)
+
+
+def market_segment_codes(price, area, thresholds):
+    """Codes into ``SEGMENT_LABELS``: High-End (high price OR large area) unless Budget (low price AND small area)"""
+    high_end = (price > thresholds['price_high']) | (area > thresholds['area_high'])
+    budget = (price < thresholds['price_low']) & (area < thresholds['area_low'])
+    return np.select([budget, high_end], [2, 1], default=0)
+
+
+def location_type_codes(location):
+    """Codes into ``LOCATION_TYPE_LABELS`` for an object array of (collapsed) location names"""
+    is_sector = np.array([isinstance(loc, str) and 'Sector' in loc for loc in location], dtype=bool)
+    present = np.array([isinstance(loc, str) for loc in location], dtype=bool)
+    return np.select([is_sector, present], [2, 1], default=0)
+
+
+def collapse_rare_locations(df, stats, column='location_clean'):
+    """Replace locations seen fewer than ``stats.rare_count`` times (or never) with 'Other'"""
+    if column not in df.columns:
+        return df
+    location = df[column].astype('string')
+    known = location.isin(stats.known_locations).to_numpy(bool)
+    df[column] = location.where(known | location.isna().to_numpy(), 'Other')
+    return df
+
+
+def assign_market_segment(df, stats):
+    """Market segment from learned price/area quantiles (Budget, Standard, High-End)"""
+    codes = market_segment_codes(_values(df, 'price'), _values(df, 'area_sqft'), stats.thresholds)
+    df['market_segment'] = SEGMENT_LABELS[codes]
+    return df
+
+
+def add_location_type(df, column='location_clean'):
+    """Sector / Named Area / Unknown from the (collapsed) location name"""
+    if column not in df.columns:
+        return df
+    location = df[column].astype('string')
+    is_sector = location.str.contains('Sector', regex=False).fillna(False).to_numpy(bool)
+    df['is_sector'] = is_sector
+    df['location_type'] = LOCATION_TYPE_LABELS[np.select([is_sector, location.notna().to_numpy()], [2, 1], 0)]
+    return df
+
+
+def apply_stateful_features(df, stats):
+    """Apply the rare-location collapse and market segments with previously learned ``stats``"""
+    collapse_rare_locations(df, stats)
+    add_location_type(df)
+    assign_market_segment(df, stats)
+    return df
+
+
+def standardize_location(location):
+    """Scalar version of ``data.cleaning.standardize_locations`` for single listings"""
+    if not isinstance(location, str):
+        return None
+    return SECTOR_PATTERN.sub(r'Sector \1', location.strip().title())
+
+
+class HousingFeatureTransformer(BaseEstimator, TransformerMixin):
+    """
+    Fit/transform version of ``create_housing_features``.
+
+    ``fit`` learns the market-segment quantiles and the set of known (non-rare)
+    locations once; ``transform`` applies them without recomputing anything
+    from the data it is given. Input can be a DataFrame, a dict (one listing)
+    or a list of dicts. Dict input skips pandas entirely; use
+    ``transform_records`` to get the raw arrays back.
+    """
+
+    def __init__(self, rare_count=RARE_LOCATION_COUNT, location_column='location'):
+        self.rare_count = rare_count
+        self.location_column = location_column
+
+    def _clean_locations(self, df):
+        if 'location_clean' in df.columns or self.location_column not in df.columns:
+            return df
+        return standardize_locations(df.copy(), self.location_column)
+
+    def _set_stats(self, stats):
+        self.stats_ = stats
+        self.thresholds_ = dict(stats.thresholds)
+        self.known_locations_ = frozenset(stats.known_locations)
+        return self
+
+    def fit(self, X, y=None):
+        df = self._clean_locations(_as_frame(X))
+        return self._set_stats(FeatureStats.from_frame(df, self.rare_count))
+
+    def partial_fit(self, X, y=None):
+        """Update the statistics with another chunk (exact quantiles; see ``FeatureStatsAccumulator``)"""
+        if not hasattr(self, '_accumulator'):
+            self._accumulator = FeatureStatsAccumulator(self.rare_count)
+        self._accumulator.update(self._clean_locations(_as_frame(X)))
+        return self._set_stats(self._accumulator.finalize())
+
+    def transform(self, X):
+        if isinstance(X, (dict, list)):
+            return pd.DataFrame(self.transform_records(X), copy=False)
+        df = self._clean_locations(X)
+        df = df.copy() if df is X else df
+        add_stateless_features(df)
+        return apply_stateful_features(df, self.stats_)
+
+    def transform_records(self, records):
+        """
+        Fast path for one listing or a small batch: dict(s) in, dict of NumPy arrays out.
+
+        Categorical features come back as object arrays of labels.
+        """
+        if isinstance(records, dict):
+            records = [records]
+        columns = {name: np.array([_as_float(r.get(name)) for r in records], dtype=float)
+                   for name in RAW_NUMERIC}
+        out = dict(columns)
+        price_per_sqft = np.array([_as_float(r.get('price_per_sqft')) for r in records], dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_per_sqft = np.where(np.isnan(price_per_sqft), columns['price'] / columns['area_sqft'], price_per_sqft)
+        for name, values in stateless_feature_arrays(columns['price'], columns['area_sqft'], columns['bhk'],
+                                                     columns['parking'], columns['age_years'],
+                                                     price_per_sqft).items():
+            if name in CATEGORY_FEATURES:
+                labels = np.array(CATEGORY_FEATURES[name] + [None], dtype=object)
+                values = labels[values]
+            out[name] = values
+
+        known = self.known_locations_
+        location = [standardize_location(r.get(self.location_column)) for r in records]
+        location = np.array([loc if loc is None or loc in known else 'Other' for loc in location], dtype=object)
+        out['location_clean'] = location
+        type_codes = location_type_codes(location)
+        out['is_sector'] = type_codes == 2
+        out['location_type'] = LOCATION_TYPE_LABELS[type_codes]
+        out['market_segment'] = SEGMENT_LABELS[market_segment_codes(columns['price'], columns['area_sqft'],
+                                                                    self.thresholds_)]
+        return out
+
+
+def _as_float(value):
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _as_frame(X):
+    if isinstance(X, dict):
+        return pd.DataFrame([X])
+    if isinstance(X, list):
+        return pd.DataFrame(X)
+    return X
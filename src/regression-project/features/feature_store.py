@@ -0,0 +1,180 @@
+"""
+Incremental on-disk feature store keyed by listing fingerprint.
+
+Each raw row is fingerprinted by hashing its raw fields. On a pipeline run
+only listings that are new or whose fingerprint changed go through cleaning
+and feature engineering; the rest reuse their cached feature rows. The store
+also remembers rows that cleaning dropped, so those are not recomputed on
+every run either. Features depend on the fitted ``HousingFeatureTransformer``
+and the cleaning rules, so a change to either invalidates the whole store.
+
+Tables are kept in the memory-mappable column format from ``data.ingestion``,
+one generation directory per run, with a ``CURRENT`` pointer file swapped
+atomically.
+"""
+import hashlib
+import json
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data.cleaning import RULE_SETS, apply_rules
+from data.ingestion import read_column_store, write_column_store
+
+KEY_COLUMN = '_key'
+FINGERPRINT_COLUMN = '_fingerprint'
+
+
+def row_fingerprints(df, columns=None):
+    """uint64 hash of each row's raw fields (independent of the index)"""
+    columns = sorted(df.columns) if columns is None else columns
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy(np.uint64)
+
+
+def listing_keys(df, key='listing_id', fingerprints=None):
+    """uint64 key per row: hash of ``key`` if present, otherwise the row fingerprint itself"""
+    if key in df.columns:
+        return pd.util.hash_array(df[key].astype(str).to_numpy(object))
+    return fingerprints if fingerprints is not None else row_fingerprints(df)
+
+
+def pipeline_version(transformer, rules):
+    """Hash of everything besides the raw fields that the cached features depend on"""
+    state = {
+        'params': transformer.get_params(),
+        'thresholds': transformer.thresholds_,
+        'known_locations': sorted(transformer.known_locations_),
+        'rules': [(rule.name, rule.description) for rule in rules],
+    }
+    return hashlib.sha256(json.dumps(state, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _lookup(old_keys, old_values, keys):
+    """Vectorized dict lookup on uint64 keys: (found mask, value or 0)"""
+    if len(old_keys) == 0:
+        return np.zeros(len(keys), dtype=bool), np.zeros(len(keys), dtype=old_values.dtype)
+    order = np.argsort(old_keys, kind='stable')
+    sorted_keys = old_keys[order]
+    pos = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    found = sorted_keys[pos] == keys
+    return found, np.where(found, old_values[order][pos], 0)
+
+
+class FeatureStore:
+    """
+    Cache of engineered features that is refreshed incrementally.
+
+    >>> store = FeatureStore('data/feature_store')
+    >>> features, stats = store.update(raw_df, fitted_transformer)
+    >>> stats['computed']  # rows that actually went through cleaning + features
+    """
+
+    def __init__(self, directory, key='listing_id'):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.key = key
+
+    @property
+    def _current_path(self):
+        return self.directory / 'CURRENT'
+
+    def _current(self):
+        try:
+            return self.directory / self._current_path.read_text().strip()
+        except OSError:
+            return None
+
+    def _load(self, version):
+        current = self._current()
+        if current is None or not (current / 'meta.json').exists():
+            return None
+        meta = json.loads((current / 'meta.json').read_text())
+        if meta['version'] != version:
+            return None
+        return read_column_store(current / 'index'), read_column_store(current / 'features')
+
+    def load(self):
+        """Cached feature rows of the last run (empty frame if there is none)"""
+        current = self._current()
+        if current is None:
+            return pd.DataFrame()
+        return read_column_store(current / 'features').drop(columns=[KEY_COLUMN, FINGERPRINT_COLUMN])
+
+    def update(self, raw, transformer, rules='advanced', drop_removed=True):
+        """
+        Bring the store up to date with ``raw`` and return ``(features, stats)``.
+
+        Only rows whose key is new or whose raw-field fingerprint changed are
+        cleaned and transformed. With ``drop_removed`` listings no longer in
+        ``raw`` are dropped from the store.
+        """
+        start = time.perf_counter()
+        rules = RULE_SETS[rules] if isinstance(rules, str) else rules
+        version = pipeline_version(transformer, rules)
+
+        if self.key in raw.columns:
+            raw = raw.drop_duplicates(self.key, keep='last')
+        fingerprints = row_fingerprints(raw)
+        keys = listing_keys(raw, self.key, fingerprints)
+
+        cached = self._load(version)
+        if cached is None:
+            unchanged = np.zeros(len(raw), dtype=bool)
+            cached_features = None
+            known = 0
+        else:
+            index, cached_features = cached
+            found, previous = _lookup(index[KEY_COLUMN].to_numpy(), index[FINGERPRINT_COLUMN].to_numpy(), keys)
+            known = int(found.sum())
+            unchanged = found & (previous == fingerprints)
+
+        # Clean and featurize only the delta
+        delta = raw.iloc[np.flatnonzero(~unchanged)].copy()
+        delta[KEY_COLUMN] = keys[~unchanged]
+        delta[FINGERPRINT_COLUMN] = fingerprints[~unchanged]
+        clean, _ = apply_rules(delta, rules)
+        new_features = transformer.transform(clean) if len(clean) else clean
+
+        if cached_features is not None:
+            keep_keys = keys[unchanged] if drop_removed else np.setdiff1d(
+                cached_features[KEY_COLUMN].to_numpy(), keys[~unchanged])
+            reused = cached_features.iloc[np.flatnonzero(np.isin(cached_features[KEY_COLUMN].to_numpy(),
+                                                                 keep_keys))]
+            features = pd.concat([reused, new_features], ignore_index=True) if len(new_features) else reused
+        else:
+            features = new_features.reset_index(drop=True)
+
+        # Nothing new, changed or removed: the current generation is still valid
+        if cached is None or not unchanged.all() or (drop_removed and len(cached[0]) != len(raw)):
+            index = pd.DataFrame({KEY_COLUMN: keys, FINGERPRINT_COLUMN: fingerprints})
+            self._write(index, features, version)
+
+        stats = {
+            'rows': len(raw),
+            'new': len(raw) - known,
+            'changed': int(known - unchanged.sum()),
+            'unchanged': int(unchanged.sum()),
+            'computed': len(delta),
+            'feature_rows': len(features),
+            'seconds': time.perf_counter() - start,
+        }
+        return features.drop(columns=[KEY_COLUMN, FINGERPRINT_COLUMN]), stats
+
+    def _write(self, index, features, version):
+        generation = f'gen-{time.strftime("%Y%m%d%H%M%S")}-{uuid.uuid4().hex[:8]}'
+        path = self.directory / generation
+        path.mkdir()
+        write_column_store(index, path / 'index')
+        write_column_store(features, path / 'features')
+        (path / 'meta.json').write_text(json.dumps({'version': version, 'rows': len(features)}))
+
+        previous = self._current()
+        tmp = self._current_path.with_name(f'CURRENT.{uuid.uuid4().hex}.tmp')
+        tmp.write_text(generation)
+        tmp.replace(self._current_path)
+        if previous is not None and previous != path:
+            shutil.rmtree(previous, ignore_errors=True)
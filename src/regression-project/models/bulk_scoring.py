@@ -0,0 +1,215 @@
+"""
+Chunked, resumable bulk scoring of listing files.
+
+A CSV shaped like ``raw_processed.csv`` is read in typed chunks
+(``data.ingestion.iter_csv_chunks``), checked against the input-only
+``scoring`` cleaning rules, featurized with the stateless features and
+scored by a registry model. Each chunk's predictions are written as one part
+in the memory-mappable column format, then committed by appending a line to
+``manifest.jsonl``, so memory is bounded by one chunk. Output rows align
+with input rows: rows that fail cleaning have a NaN price and
+``scored=False``.
+
+A part only counts once its manifest line exists, so an interrupted job
+resumes after its last committed chunk. The manifest header pins the input
+hash, model version and chunk size; a job cannot be resumed with a
+different input or model.
+
+    python -m models.bulk_scoring data/raw_processed.csv data/scores/raw_processed
+"""
+import itertools
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data.cleaning import RULE_SETS, evaluate_rules
+from data.ingestion import iter_csv_chunks, read_column_store, write_column_store
+from features.feature_engineering import add_stateless_features
+from models.compiled import CompiledModel
+from models.persistence import REGISTRY_DIR, ModelRegistry
+from models.train import FEATURE_COLUMNS
+from utils.helpers import cached_file_sha256
+
+CHUNKSIZE = 100000
+MANIFEST_FILE = 'manifest.jsonl'
+INPUT_COLUMNS = ['area_sqft', 'bhk', 'parking']
+PASSTHROUGH_COLUMNS = ['listing_id', 'title', 'location']  # Copied to the output when present
+
+
+def score_chunk(model, chunk, rules=RULE_SETS['scoring']):
+    """``(predicted_price, scored)`` of every row of a raw chunk"""
+    keep = evaluate_rules(chunk, rules).all(axis=1)
+    prices = np.full(len(chunk), np.nan)
+    if keep.any():
+        valid = add_stateless_features(chunk.take(np.flatnonzero(keep)))
+        if isinstance(model, CompiledModel):
+            inputs = {column: valid[column].to_numpy(dtype=float, na_value=np.nan)
+                      if column != 'area_category' else valid[column].to_numpy(dtype=object)
+                      for column in FEATURE_COLUMNS}
+        else:
+            inputs = valid[FEATURE_COLUMNS]
+        prices[keep] = model.predict(inputs)
+    return prices, keep
+
+
+class BulkScoringJob:
+    """
+    Score ``input_path`` into the output directory ``output_dir``, resuming if it holds a partial run.
+
+    >>> job = BulkScoringJob('data/raw_processed.csv', 'data/scores/raw_processed')
+    >>> stats = job.run(progress=print)
+    >>> scores = job.read()  # one frame over the memory-mapped parts
+    """
+
+    def __init__(self, input_path, output_dir, registry=None, version=None, chunksize=CHUNKSIZE, compiled=True):
+        self.input_path = Path(input_path)
+        self.output_dir = Path(output_dir)
+        self.registry = registry or ModelRegistry(REGISTRY_DIR)
+        self.version = version or self.registry.active_version()
+        if self.version is None:
+            raise LookupError(f'No active model in {self.registry.directory}')
+        self.chunksize = chunksize
+        self.compiled = compiled
+        self.header = None
+        self.parts = []
+        self.complete = False
+
+    @property
+    def manifest_path(self):
+        return self.output_dir / MANIFEST_FILE
+
+    def _expected_header(self):
+        return {
+            'input': str(self.input_path.resolve()),
+            'input_sha256': cached_file_sha256(self.input_path, self.output_dir / 'hashes.json'),
+            'model_version': self.version,
+            'chunksize': self.chunksize,
+        }
+
+    def _recover(self):
+        """Load committed parts; drop a torn manifest line and any uncommitted part directories"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        expected = self._expected_header()
+        self.header, self.parts, self.complete = None, [], False
+        if self.manifest_path.exists():
+            good_bytes = 0
+            with open(self.manifest_path, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Torn final line from a crash
+                    good_bytes += len(line)
+                    if self.header is None:
+                        self.header = entry
+                    elif entry.get('complete'):
+                        self.complete = True
+                    else:
+                        self.parts.append(entry)
+            with open(self.manifest_path, 'r+b') as f:
+                f.truncate(good_bytes)
+        if self.header is not None and self.header != expected:
+            raise ValueError(f'{self.output_dir} holds a run with a different input, model or chunk size; '
+                             'remove it to start over')
+        if self.header is None:
+            self.header = expected
+            self._append(expected)
+        committed = {part['part'] for part in self.parts}
+        for path in self.output_dir.glob('part-*'):
+            if path.name not in committed:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _append(self, entry):
+        with open(self.manifest_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _load_model(self):
+        if self.compiled and self.registry.metadata(self.version).get('compiled'):
+            return self.registry.load_compiled(self.version)
+        return self.registry.load(self.version)
+
+    @property
+    def rows_done(self):
+        return sum(part['rows'] for part in self.parts)
+
+    def run(self, progress=None, cancel=None):
+        """
+        Score every chunk not committed yet and return the run statistics.
+
+        ``progress(stats)`` is called after each committed chunk; the job stops
+        after the current chunk once ``cancel()`` returns True (and can be
+        resumed later).
+        """
+        start = time.perf_counter()
+        self._recover()
+        resumed_from = self.rows_done
+
+        def stats():
+            elapsed = time.perf_counter() - start
+            rows = self.rows_done - resumed_from
+            return {'rows_done': self.rows_done, 'rows_this_run': rows, 'parts': len(self.parts),
+                    'scored': sum(part['scored'] for part in self.parts), 'seconds': elapsed,
+                    'rows_per_second': rows / elapsed if elapsed else None, 'resumed_from': resumed_from,
+                    'model_version': self.version, 'complete': self.complete}
+
+        if self.complete:
+            return stats()
+        model = self._load_model()
+        header = pd.read_csv(self.input_path, nrows=0).columns
+        usecols = [c for c in INPUT_COLUMNS + PASSTHROUGH_COLUMNS if c in header]
+        # Every part is exactly one chunk (the chunk size is pinned in the header), so skipping the committed
+        # parts' chunks resumes at rows_done. They are parsed and dropped one at a time: a list-like skiprows
+        # would make pandas build a set of every skipped row number
+        chunks = iter_csv_chunks(self.input_path, self.chunksize, usecols=usecols)
+        for chunk in itertools.islice(chunks, len(self.parts), None):
+            first = self.rows_done
+            prices, scored = score_chunk(model, chunk)
+            out = pd.DataFrame({'row': np.arange(first, first + len(chunk), dtype=np.int64)})
+            for column in PASSTHROUGH_COLUMNS:
+                if column in chunk.columns:
+                    out[column] = chunk[column].to_numpy()
+            out['predicted_price'] = prices
+            out['scored'] = scored
+
+            name = f'part-{len(self.parts):05d}'
+            write_column_store(out, self.output_dir / name)
+            part = {'part': name, 'first_row': first, 'rows': len(chunk), 'scored': int(scored.sum())}
+            self._append(part)
+            self.parts.append(part)
+            if progress is not None:
+                progress(stats())
+            if cancel is not None and cancel():
+                return stats()
+        self._append({'complete': True, 'rows': self.rows_done})
+        self.complete = True
+        return stats()
+
+    def read(self, columns=None):
+        """All committed predictions as one frame, in input order"""
+        frames = [read_column_store(self.output_dir / part['part'], columns) for part in self.parts]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Score a listing CSV in chunks (resumable)')
+    parser.add_argument('input')
+    parser.add_argument('output', help='Output directory; an unfinished run there is resumed')
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    parser.add_argument('--version', help='Model version (default: the active one)')
+    parser.add_argument('--sklearn', action='store_true', help='Score with the pipeline, not the compiled model')
+    args = parser.parse_args()
+
+    job = BulkScoringJob(args.input, args.output, version=args.version, chunksize=args.chunksize,
+                         compiled=not args.sklearn)
+    stats = job.run(progress=lambda s: print(f"{s['rows_done']:,} rows ({s['scored']:,} scored), "
+                                             f"{s['rows_per_second']:,.0f} rows/s", flush=True))
+    print(json.dumps(stats, indent=2))
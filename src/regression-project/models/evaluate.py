@@ -0,0 +1,163 @@
+"""
+Vectorized regression metrics and bootstrap confidence intervals.
+
+Every metric is a function of a handful of per-row terms (absolute error,
+squared error, relative error, target and log-target moments, ...). Those
+terms are summed along the last axis of a stacked predictions array, e.g.
+(models x folds x rows), so all metrics of all models and folds come out of
+one NumPy pass. NaN marks padding, for folds of unequal size.
+
+Bootstrap replicates reuse the same terms: each replicate is a vector of
+multinomial resampling counts, and a batch of replicates is one matrix
+product of the counts with the per-row terms.
+"""
+import numpy as np
+import pandas as pd
+
+from config import RANDOM_STATE
+
+METRICS = ['mae', 'rmse', 'r2', 'mape', 'log_mae', 'log_rmse', 'log_r2']
+MIN_PRICE = 1.0  # Predictions are clipped here before taking logs
+BOOTSTRAP_BATCH_CELLS = 2 ** 22  # Resample counts drawn per batch (replicates x rows), ~32 MB per int64 array
+_TERMS = ['n', 'abs', 'sq', 'rel', 'y', 'y2', 'log_abs', 'log_sq', 'log_y', 'log_y2']
+
+
+def row_terms(y_true, y_pred):
+    """
+    Per-row metric terms, shape ``broadcast(y_true, y_pred).shape + (len(_TERMS),)``.
+
+    Rows where either value is NaN contribute zero to every term.
+    """
+    y_true, y_pred = np.broadcast_arrays(np.asarray(y_true, dtype=float), np.asarray(y_pred, dtype=float))
+    valid = ~(np.isnan(y_true) | np.isnan(y_pred))
+    out = np.zeros(y_true.shape + (len(_TERMS),))
+    y, pred = y_true[valid], y_pred[valid]
+    error = pred - y
+    log_y = np.log(np.maximum(y, MIN_PRICE))
+    log_error = np.log(np.maximum(pred, MIN_PRICE)) - log_y
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = np.where(y != 0, np.abs(error) / np.abs(y), 0.0)
+    out[valid] = np.column_stack([np.ones(len(y)), np.abs(error), error ** 2, relative, y, y ** 2,
+                                  np.abs(log_error), log_error ** 2, log_y, log_y ** 2])
+    return out
+
+
+def metrics_from_sums(sums):
+    """Metrics from summed terms (``..., len(_TERMS)``); returns a dict of arrays"""
+    s = dict(zip(_TERMS, np.moveaxis(np.asarray(sums, dtype=float), -1, 0)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = s['n']
+        total = s['y2'] - s['y'] ** 2 / n
+        log_total = s['log_y2'] - s['log_y'] ** 2 / n
+        return {
+            'mae': s['abs'] / n,
+            'rmse': np.sqrt(s['sq'] / n),
+            'r2': 1 - s['sq'] / total,
+            'mape': 100 * s['rel'] / n,
+            'log_mae': s['log_abs'] / n,
+            'log_rmse': np.sqrt(s['log_sq'] / n),
+            'log_r2': 1 - s['log_sq'] / log_total,
+        }
+
+
+def batch_metrics(y_true, y_pred):
+    """
+    Every metric for every leading index of ``y_pred`` in one pass.
+
+    ``y_pred`` is e.g. (models x folds x rows) and ``y_true`` anything that
+    broadcasts against it, e.g. (folds x rows); metrics reduce the last axis.
+
+    >>> m = batch_metrics(y_true, predictions)   # predictions: (models, folds, rows)
+    >>> m['rmse'].shape
+    (models, folds)
+    """
+    return metrics_from_sums(row_terms(y_true, y_pred).sum(axis=-2))
+
+
+def _pooled_terms(y_true, y_pred):
+    """Per-row terms with folds pooled, as (rows with data) x (models * terms)"""
+    y_pred = np.asarray(y_pred, dtype=float)
+    n_models = y_pred.shape[0]
+    terms = row_terms(y_true, y_pred).reshape(n_models, -1, len(_TERMS))
+    flat = terms.transpose(1, 0, 2).reshape(terms.shape[1], -1)
+    # Keep only the positions that hold data (padding is shared across models)
+    return flat[flat[:, _TERMS.index('n')::len(_TERMS)].any(axis=1)], n_models
+
+
+def bootstrap_metrics(y_true, y_pred, n_boot=1000, random_state=RANDOM_STATE, batch_size=250, _pooled=None):
+    """
+    Bootstrap replicates of every metric, resampling rows jointly for all models.
+
+    ``y_pred`` is (models x rows) or (models x folds x rows); folds are pooled
+    before resampling. Returns a dict of (models x n_boot) arrays. Because all
+    models share the resampling counts, replicate differences between models
+    are paired. At most ``batch_size`` replicates are drawn at once, fewer
+    for large ``n_rows`` so a batch stays within ``BOOTSTRAP_BATCH_CELLS``.
+    """
+    flat, n_models = _pooled if _pooled is not None else _pooled_terms(y_true, y_pred)
+    n_rows = len(flat)
+    batch_size = max(1, min(batch_size, BOOTSTRAP_BATCH_CELLS // max(n_rows, 1)))
+    rng = np.random.default_rng(random_state)
+    sums = np.empty((n_boot, flat.shape[1]))
+    for start in range(0, n_boot, batch_size):
+        b = min(batch_size, n_boot - start)
+        # Multinomial counts of b resamples, from one bincount over all their draws
+        draws = rng.integers(0, n_rows, size=(b, n_rows)) + (np.arange(b) * n_rows)[:, None]
+        counts = np.bincount(draws.ravel(), minlength=b * n_rows).reshape(b, n_rows)
+        sums[start:start + b] = counts.astype(float) @ flat
+    return metrics_from_sums(sums.reshape(n_boot, n_models, len(_TERMS)).transpose(1, 0, 2))
+
+
+def confidence_interval(replicates, level=0.95):
+    """(low, high) percentile interval along the last axis"""
+    tail = (1 - level) / 2
+    low, high = np.nanquantile(replicates, [tail, 1 - tail], axis=-1)
+    return low, high
+
+
+def compare_models(y_true, y_pred, names, n_boot=1000, level=0.95, random_state=RANDOM_STATE):
+    """
+    Pooled metrics of each model with bootstrap confidence intervals, sorted by RMSE.
+
+    Also reports how often (over the replicates) each model's RMSE beats the
+    best model's, a paired measure of whether the gap is real.
+    """
+    pooled = _pooled_terms(y_true, y_pred)
+    point = metrics_from_sums(pooled[0].sum(axis=0).reshape(pooled[1], len(_TERMS)))
+    replicates = bootstrap_metrics(y_true, y_pred, n_boot, random_state, _pooled=pooled)
+
+    frame = pd.DataFrame(point, index=pd.Index(names, name='model'))
+    for metric in METRICS:
+        frame[f'{metric}_low'], frame[f'{metric}_high'] = confidence_interval(replicates[metric], level)
+    best = int(np.nanargmin(point['rmse']))
+    frame['p_beats_best'] = (replicates['rmse'] < replicates['rmse'][best]).mean(axis=1)
+    return frame.sort_values('rmse')
+
+
+def fold_metrics_frame(y_true, y_pred, names):
+    """Long frame of every metric per (model, fold) from a (models x folds x rows) array"""
+    metrics = batch_metrics(y_true, y_pred)
+    n_models, n_folds = np.shape(y_pred)[:2]
+    index = pd.MultiIndex.from_product([names, range(n_folds)], names=['model', 'fold'])
+    return pd.DataFrame({metric: values.reshape(-1) for metric, values in metrics.items()}, index=index)
+
+
+def stack_fold_predictions(folds, y, predictions):
+    """
+    Pad out-of-fold predictions into the (models x folds x rows) layout.
+
+    ``folds`` is the fold number of each row, ``predictions`` a list of
+    per-model arrays of out-of-fold predictions for every row. Returns
+    ``(y_stacked, predictions_stacked)``, NaN-padded to the largest fold.
+    """
+    folds = np.asarray(folds)
+    n_folds = int(folds.max()) + 1
+    order = np.argsort(folds, kind='stable')
+    sizes = np.bincount(folds, minlength=n_folds)
+    position = np.arange(len(folds)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    y_stacked = np.full((n_folds, sizes.max()), np.nan)
+    y_stacked[folds[order], position] = np.asarray(y, dtype=float)[order]
+    stacked = np.full((len(predictions), n_folds, sizes.max()), np.nan)
+    for m, values in enumerate(predictions):
+        stacked[m, folds[order], position] = np.asarray(values, dtype=float)[order]
+    return y_stacked, stacked
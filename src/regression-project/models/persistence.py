@@ -0,0 +1,531 @@
+"""
+Saving and loading trained models with joblib.
+
+Models are dumped uncompressed so their NumPy arrays can be loaded
+memory-mapped. A KNN model's spatial index (the tree and training targets,
+usually the bulk of the model) is written next to the model file as its own
+memory-mappable artifact and re-attached on load, so several processes
+serving the same model share the index pages instead of each holding a copy.
+
+``ModelRegistry`` keeps every trained pipeline as a numbered version with its
+metrics, a fingerprint of the training data and the feature schema, plus an
+``ACTIVE`` pointer file that is swapped atomically. ``ActiveModel`` loads the
+active version on first use and picks up a new one when the pointer changes,
+so servers switch models without a restart.
+
+``compile_model`` exports a fitted pipeline as plain arrays for the
+NumPy-only predictor in ``models.compiled``; registered versions get such an
+artifact whenever their estimator supports it and the artifact reproduces
+the pipeline's predictions on a sample of the training rows.
+
+Cold-start time and per-process memory of loading a version, from
+``src/regression-project``::
+
+    python -m models.persistence list
+    python -m models.persistence profile --workers 4
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import TransformedTargetRegressor
+
+from config import RANDOM_STATE, REGISTRY_DIR
+from data.ingestion import read_column_store, write_column_store
+from features.feature_engineering import AREA_BINS, AREA_LABELS
+from models.compiled import FORMAT_VERSION, MANIFEST, CompiledModel
+from models.knn import SpatialKNNRegressor
+from models.polynomial import GramPolynomialRegressor
+from utils.helpers import write_json_atomic
+
+MODEL_FILE = 'model.joblib'
+COMPILED_DIR = 'compiled'
+ARTIFACTS_DIR = 'artifacts'
+VERIFY_ROWS = 1000  # Training rows scored by both a pipeline and its compiled artifact
+VERIFY_RTOL = 1e-9
+
+# How the compiled predictor rebuilds engineered inputs from raw listing fields
+DERIVED_COLUMNS = {
+    'area_per_bhk': {'kind': 'ratio', 'numerator': 'area_sqft', 'denominator': 'bhk'},
+    'parking_ratio': {'kind': 'ratio', 'numerator': 'parking', 'denominator': 'bhk'},
+    'area_category': {'kind': 'bins', 'source': 'area_sqft', 'bins': AREA_BINS, 'labels': AREA_LABELS},
+}
+
+
+def iter_estimators(model):
+    """``model`` and every estimator nested in it (pipelines, column transformers, target wrappers)"""
+    yield model
+    children = []
+    if hasattr(model, 'steps'):
+        children = [step for _, step in model.steps]
+    elif hasattr(model, 'transformers'):
+        children = [transformer for _, transformer, _ in getattr(model, 'transformers_', model.transformers)]
+    for attribute in ('regressor_', 'estimator_'):
+        if hasattr(model, attribute):
+            children.append(getattr(model, attribute))
+    for child in children:
+        if hasattr(child, 'get_params'):
+            yield from iter_estimators(child)
+
+
+def _knn_estimators(model):
+    return [est for est in iter_estimators(model) if isinstance(est, SpatialKNNRegressor)]
+
+
+def index_path(model_path, i=0):
+    model_path = Path(model_path)
+    return model_path.with_name(f'{model_path.stem}.knn{i}.joblib')
+
+
+@contextmanager
+def _detached_indices(knns):
+    """Temporarily remove the spatial indices so they are not pickled into the model file"""
+    saved = [(knn.tree_, knn.y_) for knn in knns]
+    for knn in knns:
+        del knn.tree_, knn.y_
+    try:
+        yield
+    finally:
+        for knn, (tree, y) in zip(knns, saved):
+            knn.tree_, knn.y_ = tree, y
+
+
+def save_model(model, path):
+    """Dump ``model`` uncompressed to ``path``, with each KNN index in its own file next to it"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    knns = _knn_estimators(model)
+    fitted = [knn for knn in knns if hasattr(knn, 'tree_')]
+    for i, knn in enumerate(knns):
+        if knn in fitted:
+            knn.save_index(index_path(path, i))
+    with _detached_indices(fitted):
+        joblib.dump(model, path)
+    return path
+
+
+def load_model(path, mmap_mode='r'):
+    """Load a model saved by ``save_model``; arrays (and KNN indices) are memory-mapped by default"""
+    model = joblib.load(path, mmap_mode=mmap_mode)
+    for i, knn in enumerate(_knn_estimators(model)):
+        if index_path(path, i).exists():
+            knn.load_index(index_path(path, i), mmap_mode=mmap_mode)
+    return model
+
+
+def _compile_preprocessor(preprocessor):
+    """Manifest entries and arrays of the fitted ``build_preprocessor`` ColumnTransformer"""
+    manifest, arrays = {'categorical': {}}, {}
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == 'drop':
+            continue
+        if name == 'numeric':
+            steps = dict(transformer.steps)
+            cap = steps['cap']
+            manifest['numeric'] = [str(c) for c in cap.columns_]
+            manifest['cap_group'] = cap.group
+            arrays.update(cap_lower=cap.lower_, cap_upper=cap.upper_, cap_groups=np.asarray(cap.groups_, dtype=float),
+                          impute=steps['impute'].statistics_.astype(np.float32))
+            if 'scale' in steps:
+                # The scaler applies its statistics in the float32 dtype of the capped values
+                arrays.update(scale_mean=steps['scale'].mean_.astype(np.float32),
+                              scale_scale=steps['scale'].scale_.astype(np.float32))
+        elif name == 'categorical':
+            for column, categories in zip(columns, transformer.categories_):
+                manifest['categorical'][column] = [str(c) for c in categories]
+        else:
+            raise ValueError(f'Cannot compile transformer {name!r}')
+    return manifest, arrays
+
+
+def _compile_estimator(estimator):
+    if isinstance(estimator, SpatialKNNRegressor):
+        raise ValueError('KNN models cannot be compiled; their index is the training set')
+    if isinstance(estimator, GramPolynomialRegressor):
+        terms = np.full((len(np.vstack([t[:, :1] for t in estimator.terms_])), estimator.degree), -1, dtype=np.intp)
+        row = 0
+        for t in estimator.terms_:
+            terms[row:row + len(t), :t.shape[1]] = t
+            row += len(t)
+        return {'estimator': 'polynomial', 'intercept': float(estimator.intercept_)}, \
+            {'terms': terms, 'coef': np.asarray(estimator.coef_, dtype=float)}
+    if hasattr(estimator, 'tree_') or hasattr(estimator, 'estimators_'):
+        trees = [est.tree_ for est in getattr(estimator, 'estimators_', [estimator])]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        shift = lambda children, offset: np.where(children >= 0, children + offset, -1)  # noqa: E731
+        return {'estimator': 'forest', 'max_depth': int(max(tree.max_depth for tree in trees))}, {
+            'roots': offsets[:-1].astype(np.intp),
+            'left': np.concatenate([shift(t.children_left, o) for t, o in zip(trees, offsets)]).astype(np.intp),
+            'right': np.concatenate([shift(t.children_right, o) for t, o in zip(trees, offsets)]).astype(np.intp),
+            'feature': np.concatenate([np.maximum(t.feature, 0) for t in trees]).astype(np.intp),
+            'threshold': np.concatenate([t.threshold for t in trees]),
+            'value': np.concatenate([t.value[:, 0, 0] for t in trees]),
+        }
+    if hasattr(estimator, 'coef_') and hasattr(estimator, 'intercept_') and np.ndim(estimator.coef_) == 1:
+        return {'estimator': 'linear', 'intercept': float(estimator.intercept_)}, \
+            {'coef': np.asarray(estimator.coef_, dtype=float)}
+    raise ValueError(f'Cannot compile {type(estimator).__name__}')
+
+
+def compiled_inputs(features):
+    """A feature frame as the column arrays ``CompiledModel.predict`` takes"""
+    return {column: values.to_numpy(dtype=float, na_value=np.nan) if pd.api.types.is_numeric_dtype(values)
+            else values.to_numpy(dtype=object) for column, values in features.items()}
+
+
+def compile_model(model, directory, sample=None):
+    """
+    Export a fitted ``make_model`` pipeline as arrays for ``models.compiled.CompiledModel``.
+
+    Supports linear models, ``GramPolynomialRegressor`` and decision trees or
+    random forests; raises ValueError for anything else (e.g. KNN, whose
+    index is the training set). When ``sample`` (a feature frame) is given,
+    the artifact's predictions on it must match the pipeline's to
+    ``VERIFY_RTOL``, otherwise ValueError is raised and nothing is written.
+    The directory is written under a temporary name and renamed into place.
+    """
+    pipeline, target = model, None
+    if isinstance(model, TransformedTargetRegressor):
+        if model.func is not np.log or model.inverse_func is not np.exp:
+            raise ValueError('Only a log target transform can be compiled')
+        target, model = 'log', model.regressor_
+    preprocessor, estimator = model.steps[0][1], model.steps[-1][1]
+    manifest, arrays = _compile_preprocessor(preprocessor)
+    estimator_manifest, estimator_arrays = _compile_estimator(estimator)
+    manifest.update(estimator_manifest, format=FORMAT_VERSION, target=target, derived=DERIVED_COLUMNS,
+                    arrays=sorted({**arrays, **estimator_arrays}))
+    arrays.update(estimator_arrays)
+
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    tmp = directory.with_name(f'.{directory.name}.{uuid.uuid4().hex[:8]}.tmp')
+    tmp.mkdir()
+    for name, values in arrays.items():
+        np.save(tmp / f'{name}.npy', np.ascontiguousarray(values))
+    (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    if sample is not None:
+        expected = np.asarray(pipeline.predict(sample), dtype=float)
+        actual = CompiledModel.load(tmp, mmap_mode=None).predict(compiled_inputs(sample))
+        if not np.allclose(actual, expected, rtol=VERIFY_RTOL, equal_nan=True):
+            shutil.rmtree(tmp)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                error = np.nanmax(np.abs(actual - expected) / np.abs(expected))
+            raise ValueError(f'Compiled predictions differ from the pipeline on {len(sample)} training rows '
+                             f'(max relative error {error:.3g})')
+    if directory.exists():
+        shutil.rmtree(directory)
+    tmp.rename(directory)
+    return directory
+
+
+def data_fingerprint(features, y=None):
+    """SHA-256 of the training rows (values and column names, not the index)"""
+    digest = hashlib.sha256(json.dumps(list(map(str, features.columns))).encode())
+    digest.update(pd.util.hash_pandas_object(features, index=False).to_numpy().tobytes())
+    if y is not None:
+        digest.update(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def feature_schema(features):
+    """Column name -> dtype of the model inputs"""
+    return {column: str(dtype) for column, dtype in features.dtypes.items()}
+
+
+def memory_usage():
+    """
+    Memory of this process in MB: ``rss``, and on Linux ``pss`` (shared pages
+    split between the processes mapping them) and ``private`` (pages no other
+    process shares). A memory-mapped model counts towards ``rss`` of every
+    worker but towards ``private`` of none.
+    """
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = {line.split(':')[0]: int(line.split()[1]) for line in f if line.split()[-1:] == ['kB']}
+    except OSError:
+        import resource
+        return {'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    return {
+        'rss': fields['Rss'] / 1024,
+        'pss': fields['Pss'] / 1024,
+        'private': (fields['Private_Clean'] + fields['Private_Dirty']) / 1024,
+    }
+
+
+class ModelRegistry:
+    """
+    Versioned store of trained models.
+
+    Each version is a directory ``v0001-<timestamp>`` holding the model saved
+    by ``save_model`` and ``meta.json``; versions are never modified after
+    registration.
+
+    >>> registry = ModelRegistry()
+    >>> version = registry.register(model, metrics={'rmse': 1.2e6}, features=features, y=y)
+    >>> registry.load()  # the active version, memory-mapped
+    """
+
+    def __init__(self, directory=REGISTRY_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def _active_path(self):
+        return self.directory / 'ACTIVE'
+
+    def versions(self):
+        """Registered version names, oldest first"""
+        return sorted(p.name for p in self.directory.glob('v*') if (p / 'meta.json').exists())
+
+    def _next_number(self):
+        """One more than the highest existing version number (``len(versions())`` repeats after ``remove``)"""
+        numbers = [int(p.name[1:5]) for p in self.directory.glob('v[0-9][0-9][0-9][0-9]-*')]
+        return max(numbers, default=0) + 1
+
+    def metadata(self, version=None):
+        version = version or self.active_version()
+        if version is None:
+            raise LookupError(f'No active model in {self.directory}')
+        return json.loads((self.directory / version / 'meta.json').read_text())
+
+    def history(self):
+        """One row per version with its metrics, newest first"""
+        rows = []
+        for version in self.versions():
+            meta = self.metadata(version)
+            rows.append({'version': version, 'name': meta.get('name'), 'registered': meta['registered'],
+                         'data_fingerprint': meta['data_fingerprint'], **meta['metrics']})
+        frame = pd.DataFrame(rows)
+        if len(frame):
+            frame['active'] = frame['version'] == self.active_version()
+        return frame.iloc[::-1].reset_index(drop=True)
+
+    def active_version(self):
+        try:
+            return self._active_path.read_text().strip() or None
+        except OSError:
+            return None
+
+    def register(self, model, metrics=None, features=None, y=None, name=None, activate=True, artifacts=None,
+                 **info):
+        """
+        Save ``model`` as a new version and return its name.
+
+        ``features`` (the training frame) is used for the data fingerprint and
+        feature schema; ``info`` is stored as-is in the metadata. ``artifacts``
+        maps names to frames computed at training time (e.g. the CV
+        leaderboard), stored memory-mappable for ``load_artifact``. The
+        compiled artifact is only kept when it reproduces the pipeline on a
+        sample of ``features``; otherwise ``compile_error`` in the metadata
+        says why. The version directory is written under a temporary name
+        and renamed into place, so readers never see a half-written version.
+        """
+        tmp = self.directory / f'.register.{uuid.uuid4().hex[:8]}.tmp'
+        tmp.mkdir()
+        save_model(model, tmp / MODEL_FILE)
+        if features is None:
+            compiled, compile_error = False, 'No training rows to verify the compiled artifact against'
+        else:
+            sample = features.sample(min(len(features), VERIFY_ROWS), random_state=RANDOM_STATE)
+            try:
+                compile_model(model, tmp / COMPILED_DIR, sample)
+                compiled, compile_error = True, None
+            except ValueError as error:
+                compiled, compile_error = False, str(error)
+        for artifact, frame in (artifacts or {}).items():
+            (tmp / ARTIFACTS_DIR).mkdir(exist_ok=True)
+            write_column_store(frame, tmp / ARTIFACTS_DIR / artifact)
+        meta = {
+            'name': name,
+            'registered': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'metrics': {key: float(value) for key, value in (metrics or {}).items()},
+            'data_fingerprint': data_fingerprint(features, y) if features is not None else None,
+            'feature_schema': feature_schema(features) if features is not None else None,
+            'n_rows': None if features is None else len(features),
+            'compiled': compiled,
+            'compile_error': compile_error,
+            'artifacts': sorted(artifacts or {}),
+            **info,
+        }
+        while True:
+            # Another process may take the number between choosing it and the rename; pick the next one then
+            version = f'v{self._next_number():04d}-{time.strftime("%Y%m%d%H%M%S")}'
+            write_json_atomic(tmp / 'meta.json', {'version': version, **meta})
+            try:
+                tmp.rename(self.directory / version)
+                break
+            except OSError:
+                if not (self.directory / version).exists():
+                    raise
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Point ``ACTIVE`` at ``version`` (atomic rename, so readers see the old or the new one)"""
+        if not (self.directory / version / 'meta.json').exists():
+            raise LookupError(f'Unknown model version {version!r}')
+        tmp = self._active_path.with_name(f'ACTIVE.{uuid.uuid4().hex}.tmp')
+        tmp.write_text(version)
+        tmp.replace(self._active_path)
+
+    def load(self, version=None, mmap_mode='r'):
+        """The model of ``version`` (default: the active one)"""
+        version = version or self.active_version()
+        if version is None:
+            raise LookupError(f'No active model in {self.directory}')
+        return load_model(self.directory / version / MODEL_FILE, mmap_mode=mmap_mode)
+
+    def load_compiled(self, version=None):
+        """The NumPy-only ``CompiledModel`` of ``version`` (LookupError if it has none)"""
+        version = version or self.active_version()
+        path = self.directory / str(version) / COMPILED_DIR
+        if not (path / MANIFEST).exists():
+            raise LookupError(f'Model version {version!r} has no compiled artifact')
+        return CompiledModel.load(path)
+
+    def load_artifact(self, name, version=None, columns=None):
+        """A frame stored with ``register(artifacts=...)``, memory-mapped"""
+        version = version or self.active_version()
+        path = self.directory / str(version) / ARTIFACTS_DIR / name
+        if not (path / 'meta.json').exists():
+            raise LookupError(f'Model version {version!r} has no artifact {name!r}')
+        return read_column_store(path, columns)
+
+    def remove(self, version):
+        if version == self.active_version():
+            raise ValueError(f'{version!r} is the active model')
+        shutil.rmtree(self.directory / version)
+
+
+class ActiveModel:
+    """
+    The registry's active model, loaded lazily and swapped when ``ACTIVE`` changes.
+
+    The pointer is re-read at most every ``check_interval`` seconds; when it
+    names a new version, that version is loaded and replaces the current
+    model for subsequent calls (calls in flight finish on the old one).
+    Thread-safe; ``version`` and ``load_seconds`` describe the loaded model.
+    With ``compiled`` set, versions that have a compiled artifact are served
+    by the NumPy-only ``CompiledModel`` instead of the scikit-learn pipeline.
+
+    >>> model = ActiveModel(ModelRegistry())
+    >>> model.predict(frame)  # first call loads the model
+    """
+
+    def __init__(self, registry, check_interval=1.0, mmap_mode='r', compiled=False):
+        self.registry = registry
+        self.check_interval = check_interval
+        self.mmap_mode = mmap_mode
+        self.compiled = compiled
+        self.version = None
+        self.model = None
+        self.metadata = None
+        self.load_seconds = None
+        self._checked = float('-inf')
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def on_swap(self, callback):
+        """Call ``callback(old_version, new_version)`` after each model swap"""
+        self._listeners.append(callback)
+
+    def check_due(self):
+        """Whether the next ``get`` re-reads the pointer (and so may load a model)"""
+        return self.model is None or time.monotonic() - self._checked >= self.check_interval
+
+    def get(self):
+        """The current model, loading or swapping it first if needed"""
+        now = time.monotonic()
+        if self.model is not None and now - self._checked < self.check_interval:
+            return self.model
+        with self._lock:
+            self._checked = now
+            version = self.registry.active_version()
+            if version is None and self.model is None:
+                raise LookupError(f'No active model in {self.registry.directory}')
+            if version is not None and version != self.version:
+                start = time.perf_counter()
+                metadata = self.registry.metadata(version)
+                if self.compiled and metadata.get('compiled'):
+                    model = self.registry.load_compiled(version)
+                else:
+                    model = self.registry.load(version, mmap_mode=self.mmap_mode)
+                old, self.metadata = self.version, metadata
+                self.model, self.version = model, version
+                self.load_seconds = time.perf_counter() - start
+                for callback in self._listeners:
+                    callback(old, version)
+            return self.model
+
+    def predict(self, frame):
+        return self.get().predict(frame)
+
+
+def _profile_worker(directory, version, mmap_mode, queue, done):
+    start = time.perf_counter()
+    model = ModelRegistry(directory).load(version, mmap_mode=mmap_mode)
+    seconds = time.perf_counter() - start
+    # Touch every mapped page, as serving traffic eventually does
+    for est in iter_estimators(model):
+        for value in vars(est).values():
+            if isinstance(value, np.ndarray):
+                value.sum()
+    queue.put({'pid': os.getpid(), 'load_seconds': seconds, **{f'{k}_mb': v for k, v in memory_usage().items()}})
+    done.wait()  # Keep the mapping alive while sibling workers measure
+
+
+def profile_cold_start(registry=None, version=None, workers=4, mmap_mode='r'):
+    """
+    Load one version in ``workers`` fresh processes at once and report each
+    one's load time and memory, with and without memory-mapping.
+    """
+    import multiprocessing
+
+    registry = registry or ModelRegistry()
+    version = version or registry.active_version()
+    context = multiprocessing.get_context('spawn')
+    rows = []
+    for mode in dict.fromkeys([mmap_mode, None]):
+        queue, done = context.Queue(), context.Event()
+        processes = [context.Process(target=_profile_worker, args=(registry.directory, version, mode, queue, done))
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+        rows += [{'mmap_mode': mode, **queue.get()} for _ in processes]
+        done.set()
+        for process in processes:
+            process.join()
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect the model registry')
+    parser.add_argument('--registry', default=REGISTRY_DIR, type=Path)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='Versions and their metrics')
+    activate = commands.add_parser('activate', help='Make a version the active model')
+    activate.add_argument('version')
+    profile = commands.add_parser('profile', help='Cold-start time and memory of loading a version')
+    profile.add_argument('--version')
+    profile.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.command == 'list':
+        print(registry.history().to_string(index=False))
+    elif args.command == 'activate':
+        registry.activate(args.version)
+    else:
+        print(profile_cold_start(registry, args.version, args.workers).to_string(index=False))
@@ -0,0 +1,136 @@
+"""
+Polynomial ridge regression without materializing the expanded design.
+
+A degree-d expansion of p features has ``C(p + d, d) - 1`` columns, so the
+dense ``PolynomialFeatures`` matrix is rows x that many floats. Here the
+expansion is generated in row blocks that are folded into the Gram matrix
+``Phi^T Phi`` and ``Phi^T y`` as they are produced; only one block of the
+expansion exists at a time, and the Gram matrix depends on the number of
+terms, not the number of rows. The ridge solution comes from the Gram matrix,
+and one eigendecomposition of it gives the solution for every alpha.
+"""
+from itertools import combinations, combinations_with_replacement
+
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+
+BLOCK_BYTES = 8 * 2 ** 20  # Size of one block of expanded rows
+
+
+def monomials(n_features, degree, interaction_only=False):
+    """Index arrays of the terms of each degree, in ``PolynomialFeatures`` order (without the bias)"""
+    combos = combinations if interaction_only else combinations_with_replacement
+    return [np.array(list(combos(range(n_features), d)), dtype=np.intp).reshape(-1, d)
+            for d in range(1, degree + 1)]
+
+
+def n_terms(terms):
+    return sum(len(t) for t in terms)
+
+
+def _expansion_plan(terms):
+    """For each degree above 1: the position of every term's prefix among the previous degree's terms"""
+    plan = []
+    for lower, higher in zip(terms, terms[1:]):
+        position = {tuple(t): i for i, t in enumerate(lower)}
+        plan.append((np.array([position[tuple(t[:-1])] for t in higher], dtype=np.intp), higher[:, -1]))
+    return plan
+
+
+def iter_expanded(X, terms, block_bytes=BLOCK_BYTES):
+    """
+    Yield ``(row slice, expanded block)`` with at most ``block_bytes`` of expanded rows per block.
+
+    Degree-k terms are the degree-(k-1) terms times one more column, so each
+    block is built in place degree by degree. The block buffer is reused;
+    consume it before advancing.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    widths = [len(t) for t in terms]
+    offsets = np.concatenate([[0], np.cumsum(widths)])
+    plan = _expansion_plan(terms)
+    rows = max(1, block_bytes // (8 * offsets[-1]))
+    buffer = np.empty((min(rows, len(X)), offsets[-1]))
+    for start in range(0, len(X), rows):
+        block = X[start:start + rows]
+        out = buffer[:len(block)]
+        np.take(block, terms[0][:, 0], axis=1, out=out[:, :widths[0]])
+        for d, (prefix, last) in enumerate(plan, start=1):
+            previous = out[:, offsets[d - 1]:offsets[d]]
+            np.multiply(previous[:, prefix], block[:, last], out=out[:, offsets[d]:offsets[d + 1]])
+        yield slice(start, start + len(block)), out
+
+
+def gram_statistics(X, y, terms, block_bytes=BLOCK_BYTES):
+    """``(gram, xty, column_sums, n)`` of the expanded design, accumulated block by block"""
+    m = n_terms(terms)
+    y = np.asarray(y, dtype=np.float64)
+    gram = np.zeros((m, m))
+    xty = np.zeros((m,) + y.shape[1:])
+    column_sums = np.zeros(m)
+    for rows, block in iter_expanded(X, terms, block_bytes):
+        gram += block.T @ block
+        xty += block.T @ y[rows]
+        column_sums += block.sum(axis=0)
+    return gram, xty, column_sums, len(X)
+
+
+def ridge_from_gram(gram, xty, column_sums, n, y_mean, alphas):
+    """
+    Coefficients (terms x alphas) and intercepts (alphas) of ridge with an
+    unpenalized intercept, from the uncentered Gram statistics.
+
+    Centering is applied to the Gram matrix itself, and one eigendecomposition
+    serves every alpha.
+    """
+    mean = column_sums / n
+    centered = gram - n * np.outer(mean, mean)
+    rhs = xty - column_sums * y_mean  # X_c^T y_c
+    eigenvalues, eigenvectors = np.linalg.eigh(centered)
+    eigenvalues = np.clip(eigenvalues, 0, None)  # Round-off can make the zero modes slightly negative
+    projected = eigenvectors.T @ rhs
+    coef = eigenvectors @ (projected[:, None] / (eigenvalues[:, None] + np.asarray(alphas)[None, :]))
+    return coef, y_mean - mean @ coef
+
+
+def predict_expanded(X, terms, coef, intercept, block_bytes=BLOCK_BYTES):
+    """``expand(X) @ coef + intercept`` computed block by block"""
+    out = np.empty((len(X),) + np.shape(coef)[1:])
+    for rows, block in iter_expanded(X, terms, block_bytes):
+        out[rows] = block @ coef + intercept
+    return out
+
+
+class GramPolynomialRegressor(RegressorMixin, BaseEstimator):
+    """
+    ``PolynomialFeatures(degree, include_bias=False)`` + ``Ridge(alpha)`` in
+    memory proportional to the input rather than the expansion.
+
+    >>> model = GramPolynomialRegressor(degree=3, alpha=1.0).fit(X, y)
+    >>> model.predict(X_new)
+    """
+
+    def __init__(self, degree=2, alpha=1.0, interaction_only=False, block_bytes=BLOCK_BYTES):
+        self.degree = degree
+        self.alpha = alpha
+        self.interaction_only = interaction_only
+        self.block_bytes = block_bytes
+
+    def fit(self, X, y):
+        self.n_features_in_ = np.shape(X)[1]
+        self.terms_ = monomials(self.n_features_in_, self.degree, self.interaction_only)
+        y = np.asarray(y, dtype=np.float64)
+        stats = gram_statistics(X, y, self.terms_, self.block_bytes)
+        coef, intercept = ridge_from_gram(*stats, y.mean(), [self.alpha])
+        self.coef_, self.intercept_ = coef[:, 0], float(intercept[0])
+        return self
+
+    def predict(self, X):
+        return predict_expanded(X, self.terms_, self.coef_, self.intercept_, self.block_bytes)
+
+
+def polynomial_ridge_path(X, y, X_test, degree, alphas, interaction_only=False, block_bytes=BLOCK_BYTES):
+    """Predictions on ``X_test`` (rows x alphas) for every alpha from one streamed Gram matrix"""
+    terms = monomials(np.shape(X)[1], degree, interaction_only)
+    coef, intercept = ridge_from_gram(*gram_statistics(X, y, terms, block_bytes), np.mean(y), alphas)
+    return predict_expanded(X_test, terms, coef, intercept, block_bytes)
@@ -0,0 +1,661 @@
+"""
+Model-zoo training.
+
+Every model x parameter combination x CV fold is one job, dispatched to a
+process pool. The feature frame is written once as a memory-mapped column
+store (see ``data.ingestion``) and the target and fold assignment as .npy
+files; workers map those files instead of receiving pickled copies, so every
+worker reads the same pages. Each job reports its wall-clock time, CPU time
+and the worker's peak RSS (plus peak traced memory with ``--trace-memory``,
+which slows fitting several-fold), and the per-fold scores are averaged into
+a leaderboard.
+
+Run from ``src/regression-project``::
+
+    python -m models.train --models ridge knn --folds 5 --jobs 8
+"""
+import hashlib
+import json
+import os
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import ElasticNet, Lasso, LinearRegression, Ridge, enet_path
+from sklearn.model_selection import KFold, ParameterGrid
+from sklearn.pipeline import Pipeline
+from threadpoolctl import threadpool_limits
+
+from config import CV_FOLDS, N_JOBS, RANDOM_STATE
+from data.cleaning import apply_rules
+from data.ingestion import load_housing, read_column_store, write_column_store
+from data.preprocessing import CATEGORICAL_FEATURES, NUMERIC_FEATURES, build_preprocessor
+from features.feature_engineering import HousingFeatureTransformer
+from models.knn import SpatialKNNRegressor, neighbor_predictions
+from models.polynomial import GramPolynomialRegressor, polynomial_ridge_path
+
+FEATURE_COLUMNS = NUMERIC_FEATURES + CATEGORICAL_FEATURES
+
+# search='fast': whole grid per fold as one regularization path / successive halving over rows
+PATH_MODELS = ('ridge', 'lasso', 'elasticnet', 'polynomial', 'knn')
+HALVING_MODELS = ('random_forest',)
+HALVING_FACTOR = 3
+MIN_HALVING_SAMPLES = 500
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """A model family: the estimator that follows preprocessing and its parameter grid"""
+    name: str
+    estimator: object
+    grid: dict = field(default_factory=dict)
+    cost: float = 1.0  # Rough relative fit time; expensive jobs are dispatched first
+
+
+MODEL_ZOO = {spec.name: spec for spec in [
+    ModelSpec('linear', LinearRegression()),
+    ModelSpec('ridge', Ridge(), {'alpha': np.logspace(-3, 3, 13).tolist()}),
+    ModelSpec('lasso', Lasso(max_iter=5000), {'alpha': np.logspace(-5, -1, 9).tolist()}, cost=2),
+    ModelSpec('elasticnet', ElasticNet(max_iter=5000),
+              {'alpha': np.logspace(-5, -1, 9).tolist(), 'l1_ratio': [0.2, 0.5, 0.8]}, cost=2),
+    ModelSpec('knn', SpatialKNNRegressor(), {'n_neighbors': [5, 10, 20, 40], 'weights': ['uniform', 'distance']},
+              cost=3),
+    ModelSpec('polynomial', GramPolynomialRegressor(), {'degree': [2, 3], 'alpha': [0.1, 1.0, 10.0]}, cost=5),
+    ModelSpec('random_forest', RandomForestRegressor(n_jobs=1, random_state=RANDOM_STATE),
+              {'n_estimators': [100, 300], 'max_depth': [None, 12], 'min_samples_leaf': [1, 5]}, cost=50),
+]}
+
+
+def make_model(name, params=None):
+    """Preprocessing + the ``name`` estimator with ``params``, fitted on log price"""
+    estimator = clone(MODEL_ZOO[name].estimator).set_params(**(params or {}))
+    pipeline = Pipeline([('preprocess', build_preprocessor()), ('model', estimator)])
+    return TransformedTargetRegressor(pipeline, func=np.log, inverse_func=np.exp, check_inverse=False)
+
+
+def fold_assignment(n_rows, n_splits=CV_FOLDS, random_state=RANDOM_STATE):
+    """Fold number of every row (shuffled KFold)"""
+    folds = np.empty(n_rows, dtype=np.int8)
+    for k, (_, test) in enumerate(KFold(n_splits, shuffle=True, random_state=random_state).split(np.empty(n_rows))):
+        folds[test] = k
+    return folds
+
+
+def model_jobs(models, n_splits):
+    """(model, params, fold, n_samples) for every combination, most expensive models first"""
+    specs = sorted((MODEL_ZOO[name] for name in models), key=lambda spec: -spec.cost)
+    return [(spec.name, params, fold, None)
+            for spec in specs for params in ParameterGrid(spec.grid) for fold in range(n_splits)]
+
+
+def halving_schedule(n_candidates, n_rows, factor=HALVING_FACTOR, min_samples=MIN_HALVING_SAMPLES):
+    """
+    ``[(candidates, n_samples), ...]`` per round of successive halving.
+
+    Each round keeps the best ``1/factor`` of the candidates and gives the
+    survivors ``factor`` times more training rows; the last round trains on
+    all ``n_rows``.
+    """
+    n_rounds = 1 + int(np.ceil(np.log(n_candidates) / np.log(factor))) if n_candidates > 1 else 1
+    schedule = []
+    for r in range(n_rounds):
+        n_samples = max(int(n_rows / factor ** (n_rounds - 1 - r)), min(min_samples, n_rows))
+        schedule.append((n_candidates, n_samples))
+        n_candidates = int(np.ceil(n_candidates / factor))
+    return schedule
+
+
+# Regularization paths: every alpha of a family from one decomposition / warm-started solve
+
+def ridge_path(X, y, X_test, alphas):
+    """
+    Ridge predictions on ``X_test`` for every alpha from one SVD of ``X``.
+
+    Matches ``Ridge(alpha, fit_intercept=True)``; returns (test rows x alphas).
+    """
+    x_mean, y_mean = X.mean(axis=0), y.mean()
+    U, s, Vt = np.linalg.svd(X - x_mean, full_matrices=False)
+    shrink = s[:, None] / (s[:, None] ** 2 + np.asarray(alphas)[None, :])  # (components x alphas)
+    coef = Vt.T @ (shrink * (U.T @ (y - y_mean))[:, None])
+    return (X_test - x_mean) @ coef + y_mean
+
+
+def ridge_loo(X, y, alphas):
+    """
+    Leave-one-out ridge predictions of every row for every alpha, from one SVD.
+
+    Uses the closed form ``y_i - e_i / (1 - h_ii)`` with the hat-matrix
+    diagonal of the centered problem; returns (rows x alphas).
+    """
+    x_mean, y_mean = X.mean(axis=0), y.mean()
+    U, s, _ = np.linalg.svd(X - x_mean, full_matrices=False)
+    weights = s[:, None] ** 2 / (s[:, None] ** 2 + np.asarray(alphas)[None, :])
+    fitted = U @ (weights * (U.T @ (y - y_mean))[:, None]) + y_mean
+    leverage = (U ** 2) @ weights + 1 / len(y)  # 1/n from the intercept
+    return y[:, None] - (y[:, None] - fitted) / (1 - leverage)
+
+
+def coordinate_path(X, y, X_test, alphas, l1_ratio=1.0, max_iter=5000):
+    """
+    Lasso (``l1_ratio=1``) or ElasticNet predictions for every alpha from one
+    warm-started coordinate-descent path; returns (test rows x alphas).
+    """
+    x_mean, y_mean = X.mean(axis=0), y.mean()
+    order = np.argsort(alphas)[::-1]  # Strongest penalty first; each solve warm-starts the next
+    _, coefs, _ = enet_path(X - x_mean, y - y_mean, l1_ratio=l1_ratio, alphas=np.asarray(alphas)[order],
+                            max_iter=max_iter)
+    predictions = np.empty((len(X_test), len(alphas)))
+    predictions[:, order] = (X_test - x_mean) @ coefs + y_mean
+    return predictions
+
+
+def _dense(X):
+    return np.asarray(X.toarray() if hasattr(X, 'toarray') else X, dtype=float)
+
+
+def _path_predictions(name, features, y, train, test, transform):
+    """[(params, price predictions)] for the whole grid of a path model"""
+    X, X_test = transform([('preprocess', build_preprocessor())])
+    log_y = np.log(y[train])
+    spec = MODEL_ZOO[name]
+    grid = list(ParameterGrid(spec.grid))
+
+    if name == 'knn':
+        # One tree and one query with the largest k serve every (n_neighbors, weights) candidate
+        k_max = max(params['n_neighbors'] for params in grid)
+        knn = clone(spec.estimator).set_params(n_neighbors=k_max).fit(X, log_y)
+        distances, indices = knn.kneighbors(X_test)
+        neighbor_y = log_y[indices]
+        return [(params, np.exp(neighbor_predictions(distances, neighbor_y, params['n_neighbors'], params['weights'])))
+                for params in grid]
+
+    # One path per combination of the other parameters (l1_ratio, degree)
+    predictions = np.empty((len(test), len(grid)))
+    groups = {}
+    for j, params in enumerate(grid):
+        rest = tuple(sorted((k, v) for k, v in params.items() if k != 'alpha'))
+        groups.setdefault(rest, []).append(j)
+    for rest, columns in groups.items():
+        rest = dict(rest)
+        alphas = [grid[j]['alpha'] for j in columns]
+        if name == 'ridge':
+            path = ridge_loo(X, log_y, alphas) if train is test else ridge_path(X, log_y, X_test, alphas)
+        elif name == 'polynomial':
+            path = polynomial_ridge_path(X, log_y, X_test, rest['degree'], alphas)
+        else:
+            path = coordinate_path(X, log_y, X_test, alphas, rest.get('l1_ratio', 1.0), spec.estimator.max_iter)
+        predictions[:, columns] = path
+    return [(params, np.exp(predictions[:, j])) for j, params in enumerate(grid)]
+
+
+def _scores(y_true, y_pred):
+    error = y_pred - y_true
+    total = ((y_true - y_true.mean()) ** 2).sum()
+    return {
+        'mae': float(np.abs(error).mean()),
+        'rmse': float(np.sqrt((error ** 2).mean())),
+        'r2': float(1 - (error ** 2).sum() / total) if total else np.nan,
+    }
+
+
+class SharedDataset:
+    """
+    Features, target and fold assignment written once to a directory that
+    worker processes memory-map.
+
+    >>> with SharedDataset.create(features, y, folds) as shared:
+    ...     features, y, folds = SharedDataset.open(shared.path)
+    """
+
+    def __init__(self, path, owned=False):
+        self.path = Path(path)
+        self.owned = owned
+
+    @classmethod
+    def create(cls, features, y, folds, directory=None):
+        path = Path(tempfile.mkdtemp(prefix='train-', dir=directory))
+        write_column_store(features.reset_index(drop=True), path / 'features')
+        np.save(path / 'y.npy', np.asarray(y, dtype=np.float64))
+        np.save(path / 'folds.npy', np.asarray(folds, dtype=np.int8))
+        return cls(path, owned=True)
+
+    @staticmethod
+    def open(path):
+        path = Path(path)
+        return (read_column_store(path / 'features'), np.load(path / 'y.npy', mmap_mode='r'),
+                np.load(path / 'folds.npy', mmap_mode='r'))
+
+    def close(self):
+        if self.owned:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def fold_split(folds, fold, n_samples=None):
+    """
+    Train and test row indices of ``fold``.
+
+    ``fold == -1`` trains and tests on every row (leave-one-out jobs). With
+    ``n_samples`` the training rows (and a proportional share of the test rows)
+    are a fixed random subset, the same for every candidate and nested across
+    halving rounds.
+    """
+    if fold < 0:
+        rows = np.arange(len(folds))
+        return rows, rows
+    test = folds == fold
+    train = np.flatnonzero(~test)
+    test = np.flatnonzero(test)
+    if n_samples is not None and n_samples < len(train):
+        # Early halving rounds also score on a proportional share of the fold
+        rng = np.random.default_rng(fold)
+        n_test = max(int(len(test) * n_samples / len(train)), min(MIN_HALVING_SAMPLES, len(test)))
+        train = np.sort(rng.permutation(train)[:n_samples])
+        test = np.sort(rng.permutation(test)[:n_test])
+    return train, test
+
+
+def _params_key(estimator):
+    """Every (nested) parameter of an estimator, JSON-able"""
+    return {key: type(value).__name__ if hasattr(value, 'get_params') else repr(value)
+            for key, value in estimator.get_params(deep=True).items()}
+
+
+def candidate_steps(name, params=None):
+    """(preprocessing steps, final estimator) of a candidate; the steps are what the cache stores"""
+    estimator = clone(MODEL_ZOO[name].estimator).set_params(**(params or {}))
+    steps = [('preprocess', build_preprocessor())]
+    if isinstance(estimator, Pipeline):
+        steps += estimator.steps[:-1]
+        estimator = estimator.steps[-1][1]
+    return steps, estimator
+
+
+def _fit_transform(steps, features, train, test):
+    X_train, X_test = features.take(train), features.take(test)
+    for _, step in steps:
+        X_train = step.fit_transform(X_train)
+        X_test = step.transform(X_test)
+    return _dense(X_train), _dense(X_test)
+
+
+class PreprocessingCache:
+    """
+    Fitted preprocessing output per fold, shared by the worker processes.
+
+    Entries are keyed by the fold, its training rows (halving subsamples) and
+    every parameter of the preprocessing steps, and stored as .npy files. The
+    first candidate to need an entry fits and writes it; every later candidate
+    with the same preprocessing memory-maps it and only fits its estimator.
+    ``hits`` and ``misses`` count this process's lookups.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(steps, fold, n_samples):
+        state = {'fold': fold, 'n_samples': n_samples, 'steps': [(name, _params_key(step)) for name, step in steps]}
+        return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()[:24]
+
+    def transform(self, steps, features, train, test, fold, n_samples):
+        """``(X_train, X_test)`` after fitting ``steps`` on the training rows, from the cache if possible"""
+        path = self.directory / self.key(steps, fold, n_samples)
+        if (path / 'train.npy').exists():
+            self.hits += 1
+            return np.load(path / 'train.npy', mmap_mode='r'), np.load(path / 'test.npy', mmap_mode='r')
+        self.misses += 1
+        X_train, X_test = _fit_transform(steps, features, train, test)
+        path.mkdir(exist_ok=True)
+        # train.npy is renamed into place last, so its presence marks a complete entry
+        for name, X in (('test', X_test), ('train', X_train)):
+            tmp = path / f'{name}.{uuid.uuid4().hex}.tmp.npy'
+            np.save(tmp, X)
+            tmp.replace(path / f'{name}.npy')
+        return X_train, X_test
+
+
+def run_job(job, data, trace_memory=False, cache=None):
+    """
+    Fit one job and score it on its held-out rows; returns one result row per candidate.
+
+    A job is ``(model, params, fold, n_samples)``. ``params=None`` runs the
+    model's whole grid as one regularization path (see ``PATH_MODELS``).
+    With a ``PreprocessingCache`` the preprocessing output is looked up
+    instead of refitted; the job's hit and miss counts are reported on its
+    first row, so the columns sum to the totals.
+    """
+    name, params, fold, n_samples = job
+    features, y, folds = data
+    train, test = fold_split(folds, fold, n_samples)
+    lookups = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    preprocess_seconds = 0.0
+
+    def transform(steps):
+        nonlocal preprocess_seconds
+        start = time.perf_counter()
+        if cache is None:
+            X = _fit_transform(steps, features, train, test)
+        else:
+            X = cache.transform(steps, features, train, test, fold, n_samples)
+        preprocess_seconds += time.perf_counter() - start
+        return X
+
+    if trace_memory:
+        tracemalloc.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    if params is None:
+        candidates = _path_predictions(name, features, y, train, test, transform)
+        fit_seconds = time.perf_counter() - wall - preprocess_seconds  # Path solvers score as they fit
+    else:
+        steps, estimator = candidate_steps(name, params)
+        X_train, X_test = transform(steps)
+        start = time.perf_counter()
+        estimator.fit(X_train, np.log(y[train]))
+        fit_seconds = time.perf_counter() - start
+        candidates = [(params, np.exp(estimator.predict(X_test)))]
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else np.nan
+    if trace_memory:
+        tracemalloc.stop()
+
+    # A path's cost is shared evenly by its candidates, so per-model sums stay comparable
+    share = len(candidates)
+    hits, misses = (cache.hits - lookups[0], cache.misses - lookups[1]) if cache is not None else (0, 0)
+    return [{
+        'model': name,
+        'params': json.dumps(candidate, sort_keys=True),
+        'fold': fold,
+        **_scores(y[test], y_pred),
+        'n_train': len(train),
+        'n_test': len(test),
+        'fit_seconds': fit_seconds / share,
+        'preprocess_seconds': preprocess_seconds / share,
+        'cache_hits': hits if i == 0 else 0,
+        'cache_misses': misses if i == 0 else 0,
+        'wall_seconds': wall / share,
+        'cpu_seconds': cpu / share,
+        'peak_mb': peak / 2 ** 20,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'pid': os.getpid(),
+    } for i, (candidate, y_pred) in enumerate(candidates)]
+
+
+_WORKER = {}
+
+
+def _init_worker(path, cache_preprocessing):
+    # One BLAS/OpenMP thread per worker; the pool provides the parallelism
+    _WORKER['limits'] = threadpool_limits(1)
+    _WORKER['data'] = SharedDataset.open(path)
+    _WORKER['cache'] = PreprocessingCache(Path(path) / 'preprocessed') if cache_preprocessing else None
+
+
+def _run_in_worker(job, trace_memory):
+    return run_job(job, _WORKER['data'], trace_memory, _WORKER['cache'])
+
+
+def leaderboard(results):
+    """
+    Average the per-fold results of each (model, params) and rank by RMSE.
+
+    Candidates from a successive-halving search are scored on their last
+    round (``round``, trained on ``n_train`` rows per fold). ``finalist``
+    marks those that reached their model's final round; candidates
+    eliminated earlier were scored on fewer rows, so they rank after every
+    finalist instead of among them. Leave-one-out candidates (``cv='loo'``)
+    have one exact score over all rows, so ``folds`` is 1 and ``rmse_std``
+    is NaN.
+    """
+    last = results.groupby(['model', 'params'], sort=False)['round'].transform('max')
+    results = results[results['round'] == last]
+    results = results.assign(finalist=results['round'] == results.groupby('model')['round'].transform('max'),
+                             cv=np.where(results['fold'] < 0, 'loo', 'kfold'))
+    board = (results.groupby(['model', 'params'], sort=False)
+             .agg(mae=('mae', 'mean'), rmse=('rmse', 'mean'), rmse_std=('rmse', 'std'), r2=('r2', 'mean'),
+                  folds=('fold', 'count'), cv=('cv', 'first'), round=('round', 'first'),
+                  n_train=('n_train', 'mean'), finalist=('finalist', 'first'),
+                  wall_seconds=('wall_seconds', 'sum'), cpu_seconds=('cpu_seconds', 'sum'),
+                  peak_mb=('peak_mb', 'max'))
+             .sort_values(['finalist', 'rmse'], ascending=[False, True]).reset_index())
+    board['n_train'] = board['n_train'].round().astype(int)
+    board.index = pd.RangeIndex(1, len(board) + 1, name='rank')
+    return board
+
+
+class ModelZooTrainer:
+    """
+    Cross-validate every model family of ``MODEL_ZOO`` over its grid in parallel.
+
+    ``search='grid'`` fits every (params, fold) combination. ``search='fast'``
+    computes the whole ridge/lasso/elasticnet/polynomial grid of a fold as
+    regularization paths (one SVD for ridge, one streamed Gram matrix per
+    polynomial degree, warm-started coordinate descent for the others),
+    scores every knn candidate from one KD-tree query, and runs successive
+    halving over training-set size for random_forest. ``ridge_cv='loo'``
+    scores the ridge path with exact leave-one-out instead of the folds. Both
+    modes produce the same results and leaderboard columns.
+
+    With ``cache_preprocessing`` each fold's fitted preprocessing output is
+    computed once per distinct set of preprocessing parameters and shared by
+    every candidate (see ``PreprocessingCache``); ``cache_hits_`` and
+    ``cache_misses_`` count the lookups.
+
+    >>> trainer = ModelZooTrainer(['ridge', 'knn'], n_jobs=8, search='fast')
+    >>> results = trainer.run(features, y)   # one row per (model, params, fold)
+    >>> trainer.leaderboard_.head()
+    """
+
+    def __init__(self, models=None, n_splits=CV_FOLDS, n_jobs=N_JOBS, random_state=RANDOM_STATE,
+                 trace_memory=False, search='grid', ridge_cv='kfold', halving_factor=HALVING_FACTOR,
+                 cache_preprocessing=True):
+        if search not in ('grid', 'fast'):
+            raise ValueError(f"search must be 'grid' or 'fast', got {search!r}")
+        self.models = list(MODEL_ZOO) if models is None else list(models)
+        self.n_splits = n_splits
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.trace_memory = trace_memory
+        self.search = search
+        self.ridge_cv = ridge_cv
+        self.halving_factor = halving_factor
+        self.cache_preprocessing = cache_preprocessing
+
+    def _execute(self, jobs, runner, progress, cancel):
+        """Run ``jobs`` with ``runner`` (pool or in-process), returning their rows unless cancelled"""
+        rows = []
+        if isinstance(runner, ProcessPoolExecutor):
+            futures = [runner.submit(_run_in_worker, job, self.trace_memory) for job in jobs]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                rows.extend(self._report(future.result(), progress))
+                if cancel is not None and cancel.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    break
+        else:
+            for job in jobs:
+                if cancel is not None and cancel.is_set():
+                    break
+                data, cache = runner
+                rows.extend(self._report(run_job(job, data, self.trace_memory, cache), progress))
+        return rows
+
+    def _report(self, rows, progress):
+        self.jobs_done_ += 1
+        if progress is not None:
+            progress(self.jobs_done_, self.jobs_total_, rows[-1])
+        return rows
+
+    def _fast_plan(self, n_train):
+        """Initial jobs of a fast search and the halving models with their schedules"""
+        jobs, halving = [], {}
+        for name in self.models:
+            spec = MODEL_ZOO[name]
+            if name in PATH_MODELS:
+                folds = [-1] if name == 'ridge' and self.ridge_cv == 'loo' else range(self.n_splits)
+                jobs += [(name, None, fold, None) for fold in folds]
+            elif name in HALVING_MODELS and len(ParameterGrid(spec.grid)) > 1:
+                halving[name] = halving_schedule(len(ParameterGrid(spec.grid)), n_train, self.halving_factor)
+            else:
+                jobs += model_jobs([name], self.n_splits)
+        return jobs, halving
+
+    def run(self, features, y, progress=None, cancel=None):
+        """
+        Run every job and return the per-fold results.
+
+        ``progress(done, total, row)`` is called as jobs finish (``total``
+        grows as halving rounds are scheduled). If ``cancel`` (e.g. a
+        ``threading.Event``) gets set, pending jobs are dropped and the
+        results so far are returned.
+        """
+        start = time.perf_counter()
+        folds = fold_assignment(len(features), self.n_splits, self.random_state)
+        self._n_train = int(min(np.sum(folds != k) for k in range(self.n_splits)))
+        if self.search == 'grid':
+            jobs, halving = model_jobs(self.models, self.n_splits), {}
+        else:
+            jobs, halving = self._fast_plan(self._n_train)
+        self.jobs_done_, self.jobs_total_ = 0, len(jobs)
+
+        rows = []
+        with SharedDataset.create(features[FEATURE_COLUMNS], y, folds) as shared:
+            pool = None
+            if self.n_jobs != 1:
+                pool = ProcessPoolExecutor(self.n_jobs, initializer=_init_worker,
+                                           initargs=(str(shared.path), self.cache_preprocessing))
+            try:
+                cache = PreprocessingCache(shared.path / 'preprocessed') if self.cache_preprocessing else None
+                runner = pool or (SharedDataset.open(shared.path), cache)
+                rows += self._execute(jobs, runner, progress, cancel)
+                for row in rows:
+                    row['round'] = 0
+                rows += self._successive_halving(halving, runner, progress, cancel)
+            finally:
+                if pool is not None:
+                    pool.shutdown(cancel_futures=True)
+
+        self.wall_seconds_ = time.perf_counter() - start
+        self.results_ = pd.DataFrame(rows)
+        self.leaderboard_ = leaderboard(self.results_) if rows else pd.DataFrame()
+        self.cache_hits_ = int(self.results_['cache_hits'].sum()) if rows else 0
+        self.cache_misses_ = int(self.results_['cache_misses'].sum()) if rows else 0
+        return self.results_
+
+    def _successive_halving(self, halving, runner, progress, cancel):
+        """Run the halving models round by round; every round of every model shares the pool"""
+        rows = []
+        candidates = {name: list(ParameterGrid(MODEL_ZOO[name].grid)) for name in halving}
+        n_rounds = max((len(schedule) for schedule in halving.values()), default=0)
+        for round_ in range(n_rounds):
+            if cancel is not None and cancel.is_set():
+                break
+            jobs = []
+            for name, schedule in halving.items():
+                if round_ >= len(schedule):
+                    continue
+                n_samples = schedule[round_][1]
+                jobs += [(name, params, fold, None if n_samples >= self._n_train else n_samples)
+                         for params in candidates[name] for fold in range(self.n_splits)]
+            self.jobs_total_ += len(jobs)
+            round_rows = self._execute(jobs, runner, progress, cancel)
+            for row in round_rows:
+                row['round'] = round_
+            rows += round_rows
+
+            # Keep the best 1/factor of each model's candidates for the next round
+            scores = pd.DataFrame(round_rows, columns=['model', 'params', 'rmse'])
+            for name, schedule in halving.items():
+                if round_ + 1 < len(schedule):
+                    mean_rmse = scores[scores['model'] == name].groupby('params')['rmse'].mean()
+                    keep = mean_rmse.nsmallest(schedule[round_ + 1][0]).index
+                    candidates[name] = [json.loads(params) for params in keep]
+        return rows
+
+    def refit_best(self, features, y):
+        """Refit the top leaderboard entry on all rows"""
+        best = self.leaderboard_.iloc[0]
+        return make_model(best['model'], json.loads(best['params'])).fit(features[FEATURE_COLUMNS], y)
+
+
+def register_best(trainer, features, y, registry, activate=True, cancel=None, **info):
+    """
+    Refit the trainer's best candidate on all rows and register it with its
+    CV metrics, the leaderboard and the per-fold results; returns the version
+    (None if ``cancel`` got set during the refit).
+    """
+    best = trainer.leaderboard_.iloc[0]
+    model = trainer.refit_best(features, y)
+    if cancel is not None and cancel.is_set():
+        return None
+    return registry.register(
+        model, {metric: best[metric] for metric in ('rmse', 'mae', 'r2', 'rmse_std')}, features[FEATURE_COLUMNS], y,
+        name=best['model'], activate=activate, params=json.loads(best['params']),
+        artifacts={'leaderboard': trainer.leaderboard_.reset_index(), 'cv_results': trainer.results_}, **info)
+
+
+def prepare_training_data(name='housing_cleaned', rules='advanced'):
+    """Cleaned, featurized listings and their prices"""
+    clean, _ = apply_rules(load_housing(name), rules)
+    features = HousingFeatureTransformer().fit_transform(clean.reset_index(drop=True))
+    return features, features['price'].to_numpy(dtype=float)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Cross-validate the model zoo in parallel')
+    parser.add_argument('--data', default='housing_cleaned', help='CSV name under data/')
+    parser.add_argument('--models', nargs='+', choices=list(MODEL_ZOO), default=list(MODEL_ZOO))
+    parser.add_argument('--folds', type=int, default=CV_FOLDS)
+    parser.add_argument('-j', '--jobs', type=int, default=N_JOBS)
+    parser.add_argument('--search', choices=['grid', 'fast'], default='grid',
+                        help="'fast': regularization paths + successive halving")
+    parser.add_argument('--ridge-cv', choices=['kfold', 'loo'], default='kfold')
+    parser.add_argument('--no-cache', action='store_true', help='Refit preprocessing for every candidate')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Report each job\'s peak traced allocations (peak_mb); much slower')
+    parser.add_argument('-o', '--output', help='Write the per-fold results to this CSV')
+    parser.add_argument('--register', action='store_true',
+                        help='Refit the best model and make it the active registry version')
+    args = parser.parse_args()
+
+    features, y = prepare_training_data(args.data)
+    trainer = ModelZooTrainer(args.models, n_splits=args.folds, n_jobs=args.jobs, search=args.search,
+                              ridge_cv=args.ridge_cv, cache_preprocessing=not args.no_cache,
+                              trace_memory=args.trace_memory)
+    results = trainer.run(features, y, progress=lambda done, total, row: print(
+        f"[{done}/{total}] {row['model']} {row['params']} fold {row['fold']}: "
+        f"rmse {row['rmse']:,.0f} in {row['wall_seconds']:.2f}s", flush=True))
+    if args.output:
+        results.to_csv(args.output, index=False)
+    print(f"\n{trainer.jobs_done_} jobs ({len(results)} results) on {args.jobs} workers "
+          f"in {trainer.wall_seconds_:.1f}s ({results['cpu_seconds'].sum():.1f}s CPU, preprocessing cache "
+          f"{trainer.cache_hits_} hits / {trainer.cache_misses_} misses)")
+    print(trainer.leaderboard_.head(15).to_string())
+    if args.register:
+        from models.persistence import ModelRegistry
+
+        version = register_best(trainer, features, y, ModelRegistry(), search=args.search, folds=args.folds)
+        print(f'\nRegistered {trainer.leaderboard_.iloc[0]["model"]} as {version}')
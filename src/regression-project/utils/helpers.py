@@ -0,0 +1,46 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+def file_sha256(path, block_size=1 << 20):
+    """SHA-256 of a file's content, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cached_file_sha256(path, index_path):
+    """
+    Content hash of ``path``, re-hashed only when its size or mtime changed.
+
+    The (size, mtime, hash) of each file seen is kept in the JSON file
+    ``index_path``, so repeat loads of an unchanged multi-GB CSV skip the read.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    index_path = Path(index_path)
+    try:
+        index = json.loads(index_path.read_text())
+    except (OSError, ValueError):
+        index = {}
+    entry = index.get(str(path))
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['sha256']
+
+    sha = file_sha256(path)
+    index[str(path)] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha}
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    write_json_atomic(index_path, index)
+    return sha
+
+
+def write_json_atomic(path, obj):
+    """Write JSON to a temp file and rename it over ``path``"""
+    path = Path(path)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    tmp.write_text(json.dumps(obj, indent=2, default=str))
+    tmp.replace(path)
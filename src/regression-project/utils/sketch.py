@@ -0,0 +1,67 @@
+"""
+Mergeable quantile sketch for streaming statistics.
+
+Values are counted in logarithmically spaced buckets, so any quantile is
+answered within a fixed relative error and two sketches merge by adding
+their counts. Memory is a few thousand integers regardless of how many
+values were added. ``quantile_from_counts`` is the exact counterpart for
+data summarized as value counts.
+"""
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Log-bucket quantile sketch with relative accuracy ``alpha``.
+
+    Covers positive values in ``[min_value, max_value]``; values at or below
+    zero are counted in a dedicated zero bucket and NaNs are ignored.
+    """
+
+    def __init__(self, alpha=0.005, min_value=1e-3, max_value=1e12):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = np.log(self.gamma)
+        self._offset = int(np.floor(np.log(min_value) / self._log_gamma))
+        n_buckets = int(np.ceil(np.log(max_value) / self._log_gamma)) - self._offset + 1
+        self.counts = np.zeros(n_buckets, dtype=np.int64)
+        self.zero_count = 0
+        self.count = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        index = np.ceil(np.log(positive) / self._log_gamma).astype(np.int64) - self._offset
+        np.clip(index, 0, len(self.counts) - 1, out=index)
+        self.counts += np.bincount(index, minlength=len(self.counts))
+        self.count += len(values)
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """Approximate ``q``-quantile (same convention as the lower of pandas' neighbours)"""
+        if self.count == 0:
+            return np.nan
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), rank - self.zero_count, side='right'))
+        return 2 * self.gamma ** (index + self._offset) / (self.gamma + 1)
+
+
+def quantile_from_counts(value_counts, q):
+    """Exact ``q``-quantile of the data summarized by ``{value: count}``, interpolated like pandas"""
+    values = np.array(sorted(value_counts), dtype=float)
+    if not len(values):
+        return np.nan
+    ends = np.cumsum([value_counts[v] for v in values])  # Rank just past each value's run of ties
+    rank = q * (ends[-1] - 1)
+    low, high = values[np.searchsorted(ends, [np.floor(rank), np.ceil(rank)], side='right')]
+    return float(low + (high - low) * (rank - np.floor(rank)))
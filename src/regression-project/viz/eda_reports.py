@@ -0,0 +1,277 @@
+"""
+Exploratory data summaries in one columnar pass, cached by dataset content.
+
+The EDA notebook and ``test.py`` scan the frame once per question:
+``missing_value()``, ``describe()``, ``value_counts()`` per column,
+``df.corr()``, separate histograms, ``groupby('bhk')['area_sqft'].agg(...)``
+and a nested Python loop over the correlation matrix for highly correlated
+pairs. ``eda_summary`` answers all of them from a single float matrix of the
+numeric columns, built once from the memory-mapped column cache:
+
+- counts, missingness, min/max and the first four moments from column sums
+  of the centred values,
+- quantiles from a ``QuantileSketch`` per float column; exact ones from the
+  value counts of integer columns and for columns with negative values,
+- fixed-bin histograms over each column's range,
+- the correlation matrix with pairwise-complete rows (as ``df.corr()``),
+  from four matrix products of the centred values and the non-missing mask,
+- high-correlation pairs taken from the upper triangle in one step,
+- value counts of integer and categorical columns, and per-group statistics
+  (e.g. area by bhk), from ``bincount`` over the codes.
+
+``load_eda_report`` stores the summary as JSON in ``CACHE_DIR`` under the
+CSV's content hash and the summary parameters, so an unchanged dataset is
+never summarized twice.
+
+    python -m viz.eda_reports housing_cleaned
+"""
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import CACHE_DIR, DATA_DIR
+from data.ingestion import load_csv
+from utils.helpers import cached_file_sha256, write_json_atomic
+from utils.sketch import QuantileSketch, quantile_from_counts
+
+EDA_VERSION = 3
+HISTOGRAM_BINS = 50
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+HIGH_CORRELATION = 0.8
+MAX_VALUE_COUNTS = 50  # Wider integer columns get no value counts; categories keep this many top values
+GROUP_BY = 'bhk'
+GROUP_COLUMNS = ('area_sqft', 'price')
+
+
+def _moments(X, valid):
+    """Per-column count, mean, std, skew and excess kurtosis, with pandas' sample adjustments"""
+    n = valid.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(valid, X, 0).sum(axis=0) / n
+        centred = np.where(valid, X - mean, 0)
+        squared = centred * centred  # Products, not **, which is a much slower pow() per element
+        m2 = squared.sum(axis=0)
+        m3, m4 = np.einsum('ij,ij->j', squared, centred), np.einsum('ij,ij->j', squared, squared)
+        std = np.sqrt(m2 / (n - 1))
+        skew = np.sqrt(n * (n - 1)) / (n - 2) * (m3 / n) / (m2 / n) ** 1.5
+        kurtosis = (n * (n + 1) * (n - 1) * m4 / ((n - 2) * (n - 3) * m2 ** 2)
+                    - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+    return n, mean, std, skew, kurtosis, centred
+
+
+def correlation_matrix(centred, valid):
+    """
+    Pearson correlations over the rows where both columns are present, like ``df.corr()``.
+
+    ``centred`` holds the values minus their column means, with 0 where
+    missing; every pairwise sum is a product of it and the mask.
+    """
+    mask = valid.astype(float)
+    n = mask.T @ mask
+    sums = centred.T @ mask  # sums[i, j]: sum of column i over rows where j is present too
+    squares = (centred * centred).T @ mask
+    products = centred.T @ centred
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = products - sums * sums.T / n
+        var = squares - sums ** 2 / n
+        corr = cov / np.sqrt(var * var.T)
+    np.fill_diagonal(corr, np.where(np.diag(var) > 0, 1.0, np.nan))
+    return np.clip(corr, -1, 1)
+
+
+def high_correlation_pairs(corr, columns, threshold=HIGH_CORRELATION):
+    """Upper-triangle pairs with ``|r| > threshold``, strongest first"""
+    i, j = np.triu_indices(len(columns), k=1)
+    r = corr[i, j]
+    keep = np.flatnonzero(np.abs(np.nan_to_num(r)) > threshold)
+    keep = keep[np.argsort(-np.abs(r[keep]), kind='stable')]
+    return [{'a': columns[i[k]], 'b': columns[j[k]], 'r': float(r[k])} for k in keep]
+
+
+def _value_counts(df, column, values, valid):
+    """``{value: count}`` from a bincount over the codes, or None for wide integer or string columns"""
+    dtype = df[column].dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        codes = df[column].cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(dtype.categories))
+        top = np.argsort(-counts, kind='stable')[:MAX_VALUE_COUNTS]
+        return {str(dtype.categories[k]): int(counts[k]) for k in top if counts[k]}
+    if not pd.api.types.is_integer_dtype(dtype) or not valid.any():
+        return None
+    present = values[valid].astype(np.int64)
+    low, high = present.min(), present.max()
+    if high - low >= MAX_VALUE_COUNTS:
+        return None
+    counts = np.bincount(present - low)
+    return {str(low + k): int(c) for k, c in enumerate(counts) if c}
+
+
+def _group_stats(group, values, valid, quantile=0.5):
+    """
+    Count, mean, median and std of ``values`` per integer ``group`` value.
+
+    Every value of ``group`` gets a row, so all columns share the same
+    groups; a group with no ``values`` has count 0 and NaN statistics.
+    """
+    grouped = ~np.isnan(group)
+    keys = np.unique(group[grouped]).astype(np.int64)
+    keep = valid & grouped
+    codes, values = np.searchsorted(keys, group[keep]), values[keep]
+    if len(keys) < np.iinfo(np.int16).max:
+        codes = codes.astype(np.int16)  # Small ints: the stable argsort below is a radix sort
+    counts = np.bincount(codes, minlength=len(keys))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.bincount(codes, weights=values, minlength=len(keys)) / counts
+        std = np.sqrt(np.bincount(codes, weights=(values - mean[codes]) ** 2, minlength=len(keys)) / (counts - 1))
+    std[counts < 2] = np.nan
+    grouped_values = values[np.argsort(codes, kind='stable')]
+    bounds = np.cumsum(counts) - counts
+    median = [float(np.quantile(grouped_values[b:b + c], quantile)) if c else np.nan for b, c in zip(bounds, counts)]
+    return keys.tolist(), {'count': counts.tolist(), 'mean': mean.tolist(), 'median': median, 'std': std.tolist()}
+
+
+def _quantiles(df, column, present, quantiles):
+    """Exact for integer columns (from their value counts) and columns with negative values, else sketched"""
+    if pd.api.types.is_integer_dtype(df[column].dtype):
+        values, counts = np.unique(present, return_counts=True)
+        value_counts = dict(zip(values.tolist(), counts.tolist()))
+        return {str(q): quantile_from_counts(value_counts, q) for q in quantiles}
+    if len(present) and present.min() < 0:  # The sketch counts every value <= 0 as zero
+        return {str(q): float(value) for q, value in zip(quantiles, np.quantile(present, quantiles))}
+    sketch = QuantileSketch().update(present)
+    return {str(q): float(sketch.quantile(q)) for q in quantiles}
+
+
+def eda_summary(df, bins=HISTOGRAM_BINS, quantiles=QUANTILES, threshold=HIGH_CORRELATION, group_by=GROUP_BY,
+                group_columns=GROUP_COLUMNS):
+    """
+    Every summary of the EDA report for ``df``, as JSON-serializable data.
+
+    Numeric columns (including nullable integers) are converted once to a
+    float matrix; everything below is computed from it and its NaN mask.
+    Quantiles of non-negative float columns are approximate
+    (``QuantileSketch``, 0.5% relative error); integer columns and columns
+    with negative values get exact ones.
+    """
+    numeric = [column for column in df.columns
+               if pd.api.types.is_numeric_dtype(df[column]) and not pd.api.types.is_bool_dtype(df[column])]
+    X = np.empty((len(df), len(numeric)))
+    for j, column in enumerate(numeric):
+        X[:, j] = df[column].to_numpy(dtype=float, na_value=np.nan)
+    valid = ~np.isnan(X)
+    n, mean, std, skew, kurtosis, centred = _moments(X, valid)
+    low = np.where(valid, X, np.inf).min(axis=0, initial=np.inf)
+    high = np.where(valid, X, -np.inf).max(axis=0, initial=-np.inf)
+    corr = correlation_matrix(centred, valid)
+
+    columns = {}
+    for j, column in enumerate(numeric):
+        present = X[valid[:, j], j]
+        counts, edges = np.histogram(present, bins=bins, range=(low[j], high[j]) if n[j] else (0, 1))
+        columns[column] = {
+            'dtype': str(df[column].dtype), 'count': int(n[j]), 'missing': int(len(df) - n[j]),
+            'mean': float(mean[j]), 'std': float(std[j]),
+            'min': float(low[j]) if n[j] else None, 'max': float(high[j]) if n[j] else None,
+            'skew': float(skew[j]), 'kurtosis': float(kurtosis[j]),
+            'quantiles': _quantiles(df, column, present, quantiles),
+            'histogram': {'counts': counts.tolist(), 'edges': edges.tolist()},
+            'value_counts': _value_counts(df, column, X[:, j], valid[:, j]),
+        }
+    for column in df.columns.difference(numeric, sort=False):
+        missing = int(df[column].isna().sum())
+        columns[column] = {'dtype': str(df[column].dtype), 'count': len(df) - missing, 'missing': missing,
+                           'value_counts': _value_counts(df, column, None, None)}
+
+    groups = None
+    if group_by in numeric:
+        g = numeric.index(group_by)
+        values, stats = [], {}
+        for column in group_columns:
+            if column in numeric:
+                j = numeric.index(column)
+                values, stats[column] = _group_stats(X[:, g], X[:, j], valid[:, j])
+        groups = {'by': group_by, 'values': values, 'stats': stats}
+
+    return {
+        'rows': len(df),
+        'columns': columns,
+        'duplicate_rows': int(pd.util.hash_pandas_object(df, index=False).duplicated().sum()),
+        'correlation': {'columns': numeric, 'matrix': corr.tolist()},
+        'high_correlation': high_correlation_pairs(corr, numeric, threshold),
+        'groups': groups,
+    }
+
+
+def report_path(path, params, cache_root=None):
+    """Cache file of the report on ``path``, keyed by its content hash and the summary parameters"""
+    cache_root = Path(cache_root or CACHE_DIR)
+    sha = cached_file_sha256(path, cache_root / 'hashes.json')
+    params_sha = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return cache_root / f'eda-{Path(path).stem}-{sha[:16]}-{params_sha[:8]}-v{EDA_VERSION}.json'
+
+
+def load_eda_report(name='housing_cleaned', refresh=False, cache_root=None, **params):
+    """
+    The ``eda_summary`` of ``data/<name>.csv``, from the cache when the file is unchanged.
+
+    ``params`` are passed to ``eda_summary``; ``refresh`` recomputes even on a cache hit.
+    """
+    path = DATA_DIR / f'{name}.csv'
+    cache_file = report_path(path, params, cache_root)
+    if cache_file.exists() and not refresh:
+        return json.loads(cache_file.read_text())
+    report = {'dataset': name, 'sha256': cached_file_sha256(path, cache_file.parent / 'hashes.json'),
+              **eda_summary(load_csv(path, cache_root=cache_root), **params)}
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    write_json_atomic(cache_file, report)
+    return report
+
+
+def report_frames(report):
+    """The report as frames: per-column summary, correlation matrix, high-correlation pairs and group stats"""
+    rows = {}
+    for column, info in report['columns'].items():
+        row = {key: value for key, value in info.items() if key not in ('quantiles', 'histogram', 'value_counts')}
+        row['missing_pct'] = 100 * info['missing'] / report['rows'] if report['rows'] else np.nan
+        row.update({f'q{float(q):g}': value for q, value in info.get('quantiles', {}).items()})
+        rows[column] = row
+    frames = {
+        'columns': pd.DataFrame.from_dict(rows, orient='index'),
+        'correlation': pd.DataFrame(report['correlation']['matrix'], index=report['correlation']['columns'],
+                                    columns=report['correlation']['columns']),
+        'high_correlation': pd.DataFrame(report['high_correlation'], columns=['a', 'b', 'r']),
+    }
+    groups = report.get('groups')
+    if groups:
+        frames['groups'] = pd.concat({column: pd.DataFrame(stats, index=pd.Index(groups['values'], name=groups['by']))
+                                      for column, stats in groups['stats'].items()}, axis=1)
+    return frames
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='One-pass EDA summary of a dataset (cached by content hash)')
+    parser.add_argument('name', nargs='?', default='housing_cleaned', help="data/<name>.csv")
+    parser.add_argument('--refresh', action='store_true', help='Recompute even if a cached report exists')
+    parser.add_argument('--threshold', type=float, default=HIGH_CORRELATION)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    report = load_eda_report(args.name, refresh=args.refresh, threshold=args.threshold)
+    seconds = time.perf_counter() - started
+    frames = report_frames(report)
+    with pd.option_context('display.width', 200, 'display.max_columns', 30, 'display.float_format', '{:,.2f}'.format):
+        print(f"{report['dataset']}: {report['rows']:,} rows, {report['duplicate_rows']:,} duplicated\n")
+        print(frames['columns'].to_string(), end='\n\n')
+        print(frames['correlation'].to_string(), end='\n\n')
+        print(f'Highly correlated pairs (|r| > {args.threshold}):')
+        for pair in report['high_correlation']:
+            print(f"{pair['a']} <-> {pair['b']}: {pair['r']:.3f}")
+        if 'groups' in frames:
+            print(f"\nBy {report['groups']['by']}:\n{frames['groups'].to_string()}")
+    print(f'\nReport ready in {seconds:.3f}s')
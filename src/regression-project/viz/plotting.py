@@ -0,0 +1,323 @@
+"""
+Regression plots that stay fast and small at any number of points.
+
+Nothing here hands raw rows to matplotlib. Each plot is drawn from a
+fixed-size NumPy aggregate computed in one pass over the data:
+
+- ``density``: 2-D histogram counts (a scatter plot becomes a heatmap of
+  how many points fall in each cell),
+- ``histogram``: 1-D counts,
+- ``quantile_bands``: quantiles of a value (e.g. the residual) within
+  equal-count bins of another (e.g. the predicted price).
+
+Drawing cost then depends on the number of bins, not rows, so render time
+and file size stay flat as N grows. Figures are built as
+``matplotlib.figure.Figure`` objects, never through pyplot, so they render
+with the non-interactive Agg canvas and no GUI backend is loaded.
+``render_figures`` draws a report's figures in parallel worker processes,
+each writing its file directly; only the small aggregates are sent to the
+workers.
+
+    python -m viz.plotting predictions.csv --actual price -o reports/figures
+
+where every other numeric column of ``predictions.csv`` holds one model's
+predictions.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from config import N_JOBS, REPORTS_DIR
+
+DENSITY_BINS = 200
+HISTOGRAM_BINS = 50
+BAND_BINS = 30
+BAND_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+FIGSIZE = (8, 6)
+DPI = 120
+
+
+def _finite(*arrays, positive=False):
+    """The arrays as floats, restricted to rows where every one is finite (and > 0 if ``positive``)"""
+    arrays = [np.asarray(a, dtype=float).ravel() for a in arrays]
+    keep = np.logical_and.reduce([np.isfinite(a) for a in arrays])
+    if positive:
+        keep &= np.logical_and.reduce([a > 0 for a in arrays])
+    return [a[keep] for a in arrays]
+
+
+def histogram(values, bins=HISTOGRAM_BINS, log=False):
+    """Counts of ``values`` in ``bins`` bins (log-spaced when ``log``)"""
+    (values,) = _finite(values, positive=log)
+    counts, edges = np.histogram(np.log10(values) if log else values, bins=bins)
+    return {'counts': counts, 'edges': 10 ** edges if log else edges, 'log': log, 'n': len(values)}
+
+
+def _uniform_bins(values, low, high, bins):
+    """Bin index of each value in ``bins`` equal-width bins over [low, high] (-1 outside), like np.histogram"""
+    if high <= low:
+        low, high = low - 0.5, high + 0.5
+    index = np.floor((values - low) * (bins / (high - low))).astype(np.intp)
+    index[values == high] = bins - 1  # The last bin is closed
+    index[(values < low) | (values > high)] = -1
+    return index, np.linspace(low, high, bins + 1)
+
+
+def density(x, y, bins=DENSITY_BINS, log=False, limits=None):
+    """
+    2-D histogram of the points ``(x, y)``, the aggregate behind a density 'scatter' plot.
+
+    ``log`` is True (both axes), 'x' or 'y' for log-spaced bins on those
+    axes. ``limits`` (``[(xmin, xmax), (ymin, ymax)]``) crops the grid;
+    points outside are not counted. Bins are equal-width (in log space for a
+    log axis), so each point's cell is computed arithmetically and counted
+    with one ``bincount``.
+    """
+    logs = ('x' in log, 'y' in log) if isinstance(log, str) else (bool(log),) * 2
+    x, y = _finite(x, y)
+    keep = ((x > 0) | (not logs[0])) & ((y > 0) | (not logs[1]))
+    columns, edges = [], []
+    axes = zip((x[keep], y[keep]), logs, limits or (None, None), np.broadcast_to(bins, 2))
+    for values, is_log, limit, n_bins in axes:
+        if is_log:
+            values, limit = np.log10(values), None if limit is None else np.log10(limit)
+        if limit is None:
+            limit = (values.min(), values.max()) if len(values) else (0, 1)
+        index, bin_edges = _uniform_bins(values, *limit, n_bins)
+        columns.append(index)
+        edges.append(10 ** bin_edges if is_log else bin_edges)
+    (ix, iy), (xbins, ybins) = columns, (len(edges[0]) - 1, len(edges[1]) - 1)
+    inside = (ix >= 0) & (iy >= 0)
+    counts = np.bincount(ix[inside] * ybins + iy[inside], minlength=xbins * ybins).reshape(xbins, ybins)
+    return {'counts': counts, 'xedges': edges[0], 'yedges': edges[1], 'log': logs, 'n': int(keep.sum())}
+
+
+def quantile_bands(x, values, bins=BAND_BINS, quantiles=BAND_QUANTILES):
+    """
+    Quantiles of ``values`` within ``bins`` equal-count bins of ``x``.
+
+    Rows are grouped by bin with a stable sort on the small bin numbers
+    (a linear-time radix sort), then each bin's quantiles come from a
+    partial sort of its own slice. Returns the bin edges, each bin's mean
+    ``x`` and row count, and a (bins x quantiles) array of bands (no bins
+    when no row is finite).
+    """
+    x, values = _finite(x, values)
+    if not len(x):
+        return {'edges': x, 'x': x, 'counts': np.zeros(0, dtype=np.intp), 'quantiles': list(quantiles),
+                'bands': np.empty((0, len(quantiles))), 'n': 0}
+    edges = np.unique(np.quantile(x, np.linspace(0, 1, bins + 1)))
+    which = np.clip(np.searchsorted(edges, x, side='right') - 1, 0, max(len(edges) - 2, 0)).astype(np.int16)
+    counts = np.bincount(which, minlength=max(len(edges) - 1, 1))
+    grouped = values[np.argsort(which, kind='stable')]
+    bounds = np.cumsum(counts) - counts
+    bands = np.full((len(counts), len(quantiles)), np.nan)
+    for b in np.flatnonzero(counts):
+        bands[b] = np.quantile(grouped[bounds[b]:bounds[b] + counts[b]], quantiles)
+    with np.errstate(invalid='ignore'):
+        centers = np.bincount(which, weights=x, minlength=len(counts)) / counts
+    return {'edges': edges, 'x': centers, 'counts': counts, 'quantiles': list(quantiles), 'bands': bands,
+            'n': len(x)}
+
+
+def _price_axis(ax, which, log=False):
+    """Plain thousands-separated tick labels (and a log scale if ``log``) on the ``which`` ('x'/'y') axis"""
+    from matplotlib.ticker import FuncFormatter, NullFormatter
+
+    axis = getattr(ax, f'{which}axis')
+    if log:
+        getattr(ax, f'set_{which}scale')('log')
+        axis.set_minor_formatter(NullFormatter())
+    axis.set_major_formatter(FuncFormatter(lambda value, _: f'{value:,.0f}'))
+
+
+def draw_histogram(ax, hist, **kwargs):
+    ax.stairs(hist['counts'], hist['edges'], fill=True, alpha=0.7, **kwargs)
+    _price_axis(ax, 'x', hist['log'])
+    ax.set_ylabel('Frequency')
+
+
+def draw_density(ax, grid, cmap='viridis'):
+    """Cell counts on a log colour scale; empty cells are left blank"""
+    from matplotlib.colors import LogNorm
+
+    counts = np.ma.masked_equal(grid['counts'].T, 0)
+    mesh = ax.pcolormesh(grid['xedges'], grid['yedges'], counts, cmap=cmap, rasterized=True,
+                         norm=LogNorm(vmin=1, vmax=max(counts.max(), 1)))
+    _price_axis(ax, 'x', grid['log'][0])
+    _price_axis(ax, 'y', grid['log'][1])
+    return mesh
+
+
+def draw_bands(ax, bands, color='C0', label=None, outer=True):
+    """Median line with the quantile ranges shaded around it (only the innermost one unless ``outer``)"""
+    q, x = bands['bands'], bands['x']
+    n = len(bands['quantiles'])
+    for i, alpha in zip(range(n // 2), (0.15, 0.3, 0.45)):
+        if not outer and i < n // 2 - 1:
+            continue
+        ax.fill_between(x, q[:, i], q[:, n - 1 - i], color=color, alpha=alpha, linewidth=0, step='mid')
+    ax.plot(x, q[:, n // 2], color=color, label=label, drawstyle='steps-mid')
+
+
+def _figure(ncols=1, figsize=FIGSIZE):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize, layout='tight')
+    return fig, fig.subplots(1, ncols, squeeze=False)[0]
+
+
+def actual_vs_predicted_figure(grid, title='Actual vs Predicted Price', dropped=0):
+    fig, (ax,) = _figure()
+    mesh = draw_density(ax, grid)
+    low = max(grid['xedges'][0], grid['yedges'][0])
+    high = min(grid['xedges'][-1], grid['yedges'][-1])
+    ax.plot([low, high], [low, high], color='red', linestyle='--', linewidth=1, label='Perfect prediction')
+    fig.colorbar(mesh, ax=ax, label='Listings')
+    ax.set(xlabel='Actual price (₹)', ylabel='Predicted price (₹)',
+           title=f"{title} (n={grid['n']:,}{_dropped_note(dropped)})")
+    ax.legend(loc='upper left')
+    return fig
+
+
+def _dropped_note(dropped):
+    return f'; {dropped:,} predictions <= 0 not shown' if dropped else ''
+
+
+def residuals_figure(grid, bands, title='Residuals', dropped=0):
+    """Residual density over the (positive) predicted price, with its quantile bands"""
+    fig, (ax,) = _figure()
+    mesh = draw_density(ax, grid, cmap='Greys')
+    draw_bands(ax, bands, label='Median residual')
+    ax.axhline(0, color='red', linestyle='--', linewidth=1)
+    fig.colorbar(mesh, ax=ax, label='Listings')
+    qs = bands['quantiles']
+    ax.set(xlabel='Predicted price (₹)', ylabel='Residual (actual - predicted, ₹)',
+           title=f"{title} (n={bands['n']:,}; bands {qs[0]:.0%}-{qs[-1]:.0%}{_dropped_note(dropped)})")
+    ax.legend(loc='upper left')
+    return fig
+
+
+def comparison_figure(bands, metrics, title='Model Comparison'):
+    """Relative-error bands of each model over the actual price, next to their RMSE and MAE"""
+    fig, (left, right) = _figure(ncols=2, figsize=(2 * FIGSIZE[0], FIGSIZE[1]))
+    for i, (name, band) in enumerate(bands.items()):
+        draw_bands(left, band, color=f'C{i}', label=name, outer=False)
+    left.axhline(0, color='black', linestyle='--', linewidth=1)
+    _price_axis(left, 'x', log=True)
+    left.set(xlabel='Actual price (₹)', ylabel='Relative error (predicted / actual - 1)',
+             title='Error by price level (median and interquartile range)')
+    left.legend()
+
+    names = list(metrics)
+    positions = np.arange(len(names))
+    for offset, metric in ((-0.2, 'rmse'), (0.2, 'mae')):
+        right.bar(positions + offset, [metrics[name][metric] for name in names], width=0.4, label=metric.upper())
+    right.set_xticks(positions, names, rotation=30, ha='right')
+    _price_axis(right, 'y')
+    right.set(ylabel='₹', title='Error metrics')
+    right.legend()
+    fig.suptitle(title)
+    return fig
+
+
+def distribution_figure(histograms, title='Distributions'):
+    """One histogram panel per entry of ``histograms`` (name -> ``histogram`` aggregate)"""
+    fig, axes = _figure(ncols=len(histograms), figsize=(5 * len(histograms), 5))
+    for ax, (name, hist) in zip(axes, histograms.items()):
+        draw_histogram(ax, hist)
+        ax.set(title=f"{name} (n={hist['n']:,})", xlabel=name)
+    fig.suptitle(title)
+    return fig
+
+
+def _render(draw, kwargs, path, dpi):
+    fig = draw(**kwargs)
+    fig.savefig(path, dpi=dpi)
+    return str(path)
+
+
+def render_figures(figures, directory=REPORTS_DIR / 'figures', workers=N_JOBS, dpi=DPI):
+    """
+    Render ``figures`` (file name -> ``(figure_function, kwargs)``) into ``directory``.
+
+    Figures are drawn in up to ``workers`` processes, each saving its own
+    file; the kwargs should be aggregates, which are cheap to send. Returns
+    the written paths in the order given.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    jobs = [(draw, kwargs, directory / name, dpi) for name, (draw, kwargs) in figures.items()]
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        return [_render(*job) for job in jobs]
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(_render, *zip(*jobs)))
+
+
+def regression_figures(y_true, predictions):
+    """
+    Figure specs for ``render_figures``: actual-vs-predicted and residual
+    plots per model (``predictions`` maps model name to predicted prices)
+    plus one comparison figure. All aggregation happens here. Predictions
+    <= 0 are left out of the log-scale plots (and counted in their titles);
+    a model with no positive prediction for a known price only appears in
+    the comparison.
+    """
+    y_true = np.asarray(y_true, dtype=float)
+    priced = y_true > 0
+    figures, comparison_bands, metrics = {}, {}, {}
+    for name, y_pred in predictions.items():
+        y_pred = np.asarray(y_pred, dtype=float)
+        residual = y_true - y_pred
+        metrics[name] = {'rmse': float(np.sqrt(np.nanmean(residual ** 2))),
+                         'mae': float(np.nanmean(np.abs(residual)))}
+        # Price axes are logarithmic: predictions <= 0 (a linear model can make them) are left out and counted
+        positive = (y_pred > 0) & np.isfinite(y_pred) & np.isfinite(y_true)
+        dropped = int((y_pred <= 0).sum())
+        if positive.any():
+            figures[f'{name}_actual_vs_predicted.png'] = (actual_vs_predicted_figure, {
+                'grid': density(y_true, y_pred, log=True), 'title': f'{name}: Actual vs Predicted Price',
+                'dropped': dropped})
+            bands = quantile_bands(y_pred[positive], residual[positive])
+            # Crop the residual axis to the outer bands, padded, so a few extreme errors don't flatten the grid
+            low, high = np.nanmin(bands['bands'][:, 0]), np.nanmax(bands['bands'][:, -1])
+            pad = 0.5 * (high - low)
+            limits = [(bands['edges'][0], bands['edges'][-1]), (low - pad, high + pad)]
+            figures[f'{name}_residuals.png'] = (residuals_figure, {
+                'grid': density(y_pred[positive], residual[positive], log='x', limits=limits), 'bands': bands,
+                'title': f'{name}: Residuals', 'dropped': dropped})
+        if priced.any():
+            comparison_bands[name] = quantile_bands(y_true[priced], y_pred[priced] / y_true[priced] - 1)
+    figures['model_comparison.png'] = (comparison_figure, {
+        'bands': comparison_bands,
+        'metrics': metrics})
+    figures['price_distribution.png'] = (distribution_figure, {
+        'histograms': {'Price (₹)': histogram(y_true), 'Price (₹, log bins)': histogram(y_true, log=True)},
+        'title': 'Price Distribution'})
+    return figures
+
+
+if __name__ == '__main__':
+    import argparse
+
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description='Render regression plots from a CSV of actual and predicted prices')
+    parser.add_argument('predictions', help='CSV with the actual price and one column of predictions per model')
+    parser.add_argument('--actual', default='price', help='Column holding the actual price')
+    parser.add_argument('-o', '--output', default=REPORTS_DIR / 'figures', type=Path)
+    parser.add_argument('--workers', type=int, default=N_JOBS)
+    args = parser.parse_args()
+
+    frame = pd.read_csv(args.predictions)
+    models = [column for column in frame.select_dtypes('number').columns if column != args.actual]
+    started = time.perf_counter()
+    figures = regression_figures(frame[args.actual], {name: frame[name] for name in models})
+    aggregated = time.perf_counter()
+    paths = render_figures(figures, args.output, workers=args.workers)
+    print('\n'.join(paths))
+    print(f'{len(frame):,} rows, {len(models)} models: aggregate {aggregated - started:.2f}s, '
+          f'render {time.perf_counter() - aggregated:.2f}s ({len(paths)} figures, {args.workers} workers)')